@@ -1,3 +1,12 @@
+import bisect
+import curses
+import re
+import sys
+import time
+from array import array
+from collections import deque
+from itertools import accumulate
+from collections.abc import MutableSequence
 
 
 class TypeLocked(object):
@@ -78,6 +87,95 @@ class Cursor(TypeLocked):
             return self.y
 
 
+class CursorSet(object):
+    """
+    Sorted set of extra cursor locations, kept as y, x tuples so that edits
+    can be applied to every cursor in a single top to bottom sweep.
+    """
+
+    def __init__(self, positions=()):
+        self.positions = sorted(set(positions))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __contains__(self, position):
+        i = bisect.bisect_left(self.positions, position)
+        return i < len(self.positions) and self.positions[i] == position
+
+    def add(self, x, y):
+        """
+        Add a cursor at the given x, y location.
+
+        :param x:
+        :param y:
+        :return:
+        """
+
+        position = (y, x)
+        if position not in self:
+            bisect.insort(self.positions, position)
+        return self
+
+    def discard(self, x, y):
+        """
+        Remove the cursor at the given x, y location if there is one.
+
+        :param x:
+        :param y:
+        :return:
+        """
+
+        i = bisect.bisect_left(self.positions, (y, x))
+        if i < len(self.positions) and self.positions[i] == (y, x):
+            del self.positions[i]
+        return self
+
+    def clear(self):
+        del self.positions[:]
+        return self
+
+    def replace_range(self, start, end, new_end):
+        """
+        Move the cursors for the text between the `start` and `end` x, y
+        locations being replaced by text ending at `new_end`. Cursors in
+        the replaced text move to `start` and cursors after it follow the
+        text they were on.
+
+        :param start: x, y location.
+        :param end: x, y location.
+        :param new_end: x, y location.
+        :return:
+        """
+
+        start, end, new_end = (start[1], start[0]), (end[1], end[0]), (new_end[1], new_end[0])
+        positions = []
+        for y, x in self.positions:
+            if (y, x) < start:
+                positions.append((y, x))
+            elif (y, x) < end:
+                positions.append(start)
+            elif y == end[0]:
+                positions.append((new_end[0], x - end[1] + new_end[1]))
+            else:
+                positions.append((y - end[0] + new_end[0], x))
+        return self.reset(positions)
+
+    def reset(self, positions):
+        """
+        Replace the cursors with the given y, x tuples.
+
+        :param positions:
+        :return:
+        """
+
+        self.positions = sorted(set(positions))
+        return self
+
+
 class Mouse(TypeLocked):
     """
     Mouse object for keeping track of attributes related to mouse events.
@@ -135,9 +233,28 @@ class Screen(object):
     the given window object.
     """
 
-    def __init__(self, stdscr):
+    # Maximum number of times per second the terminal is written to.
+    frame_rate = 60
+
+    def __init__(self, stdscr, parent=None):
+        """
+        Drawing calls are collected and only written to the window when the
+        screen is flushed. A Screen created with a `parent` shares the
+        parent's queue so that drawing to sub-windows keeps its order.
+
+        :param stdscr:
+        :param parent:
+        """
+
         self.stdscr = stdscr
         self.cursor = Cursor(0, 0)
+        self.curses = curses
+        self.parent = parent
+        self.ops = []
+        self.delay = -1
+        self.last_update = 0.0
+        self.changed = False
+        self.pending = False
 
     def __getattr__(self, item):
         """
@@ -172,14 +289,210 @@ class Screen(object):
         :return:
         """
 
-        self.stdscr.addstr(y, x, '')
+        return self.move(y, x)
+
+    def _root(self):
+        return self if self.parent is None else self.parent
+
+    def _record(self, name, args):
+        self._root().ops.append((self.stdscr, name, args))
+        return self
+
+    def _drop_covered(self, y, x, end):
+        """
+        Drop queued single-row writes on this window that a write to row `y`
+        between `x` and `end` would completely overwrite. Scanning stops at
+        the first op whose effect depends on or changes the cursor position.
+
+        :param y:
+        :param x:
+        :param end:
+        :return:
+        """
+
+        ops = self._root().ops
+        for i in range(len(ops) - 1, -1, -1):
+            window, name, args = ops[i]
+            if name == 'move':
+                continue
+            if name != 'addstr' or not isinstance(args[0], int):
+                break
+            if window is not self.stdscr or args[0] != y:
+                continue
+            text = args[2]
+            if x <= args[1] and args[1] + len(text) <= end and '\n' not in text and '\r' not in text:
+                del ops[i]
+
+    def addstr(self, *args):
+        """
+        Queue a write. Accepts the same arguments as `window.addstr`.
+
+        :param args:
+        :return:
+        """
+
+        if isinstance(args[0], int):
+            y, x, text = args[0], args[1], args[2]
+            if not text:
+                return self.move(y, x)
+            if '\n' not in text and '\r' not in text:
+                self._drop_covered(y, x, x + len(text))
+        return self._record('addstr', args)
+
+    def move(self, y, x):
+        """
+        Queue a cursor move, replacing a move queued directly before it.
+
+        :param y:
+        :param x:
+        :return:
+        """
+
+        ops = self._root().ops
+        if ops and ops[-1][0] is self.stdscr and ops[-1][1] == 'move':
+            ops.pop()
+        return self._record('move', (y, x))
+
+    def clear(self):
+        """
+        Queue clearing the window. Clearing the root window makes everything
+        queued before it redundant, so the queue is emptied.
+
+        :return:
+        """
+
+        if self.parent is None:
+            del self.ops[:]
+        return self._record('clear', ())
+
+    def erase(self):
+        if self.parent is None:
+            del self.ops[:]
+        return self._record('erase', ())
+
+    def chgat(self, *args):
+        return self._record('chgat', args)
+
+    def scroll(self, *args):
+        return self._record('scroll', args)
+
+    def subpad(self, *args):
+        """
+        Create a sub-window that draws through this screen's queue.
+
+        :param args:
+        :return Screen:
+        """
+
+        return Screen(self.stdscr.subpad(*args), parent=self._root())
+
+    def apply(self, errors=None):
+        """
+        Write the queued ops to the windows without touching the terminal.
+
+        When an `errors` list is given, ops that fail with curses.error are
+        added to it as (name, args, error) and the rest are still written.
+
+        :param list errors:
+        :return:
+        """
+
+        root = self._root()
+        ops, root.ops = root.ops, []
+        if ops:
+            root.changed = True
+        for window, name, args in ops:
+            try:
+                getattr(window, name)(*args)
+            except curses.error as e:
+                if errors is None:
+                    raise
+                errors.append((name, args, e))
+        return self
+
+    def flush(self, force=False):
+        """
+        Apply the queued ops and mark the window for output with
+        `noutrefresh`. The terminal itself is only updated with `doupdate`
+        once per frame, unless `force` is given.
+
+        :param force:
+        :return:
+        """
+
+        root = self._root()
+        root.apply()
+        if root.changed:
+            root.stdscr.noutrefresh()
+            root.changed = False
+            root.pending = True
+
+        if not root.pending:
+            return self
+
+        now = time.time()
+        if force or now - root.last_update >= 1.0 / root.frame_rate:
+            root.curses.doupdate()
+            root.last_update = now
+            root.pending = False
         return self
 
+    def refresh(self):
+        return self.flush()
+
+    def getyx(self):
+        self.apply()
+        return self.stdscr.getyx()
+
+    def nodelay(self, flag):
+        self.delay = 0 if flag else -1
+        return self.stdscr.nodelay(flag)
+
+    def timeout(self, delay):
+        self.delay = delay
+        return self.stdscr.timeout(delay)
+
+    def getch(self, *args):
+        """
+        Get a key press. If a frame is still waiting to be written, only wait
+        for input until the frame is due, then write it and keep waiting.
+
+        :param args:
+        :return int:
+        """
+
+        self.flush()
+        if not self.pending or self.delay == 0:
+            return self.stdscr.getch(*args)
+
+        wait = int((self.last_update + 1.0 / self.frame_rate - time.time()) * 1000)
+        wait = max(wait, 1)
+        if self.delay > 0:
+            wait = min(wait, self.delay)
+
+        self.stdscr.timeout(wait)
+        try:
+            ch = self.stdscr.getch(*args)
+        finally:
+            self.stdscr.timeout(self.delay)
+
+        if ch == -1:
+            self.flush(force=True)
+            if self.delay < 0:
+                ch = self.stdscr.getch(*args)
+        return ch
+
+    def getstr(self, *args):
+        self.flush(force=True)
+        return self.stdscr.getstr(*args)
+
 
 class Callback(TypeLocked):
     debug = False
     ch = -1
-    type_bindings = {'debug': bool, 'ch': int}
+    # Callbacks that modify the lines are skipped while read only.
+    edits = False
+    type_bindings = {'debug': bool, 'ch': int, 'edits': bool}
 
     def __init__(self):
         self.debug = Callback.debug
@@ -192,7 +505,8 @@ class Callback(TypeLocked):
 
 def interface_info_refresh(interface, x=0, y=0):
     """
-    Update stats for the Interface object passed to it.
+    Update stats for the Interface object passed to it. Does nothing when
+    the interface has no debug pad.
 
     :param interface:
     :param x:
@@ -200,6 +514,9 @@ def interface_info_refresh(interface, x=0, y=0):
     :return:
     """
 
+    if interface.debug_pad is None:
+        return
+
     interface.debug_pad.addstr(0, 0, 'CURRENT:    {}'.format(' ' * 75))
     interface.debug_pad.addstr(1, 0, 'CURSOR:     {}'.format(' ' * 75))
     interface.debug_pad.addstr(2, 0, 'SCURSOR:    {}'.format(' ' * 75))
@@ -221,6 +538,56 @@ def interface_info_refresh(interface, x=0, y=0):
     interface.stdscr.move(y, x)
 
 
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def word_boundaries(line):
+    """
+    Get the sorted offsets where words start and end in the line.
+
+    :param str line:
+    :return tuple: starts, ends
+    """
+
+    starts, ends = [], []
+    for match in WORD_PATTERN.finditer(line):
+        starts.append(match.start())
+        ends.append(match.end())
+    return tuple(starts), tuple(ends)
+
+
+def next_word_end(lines, y, x):
+    """
+    Get the offset of the end of the first word ending after `x` on line
+    `y`, or the end of the line if there is none.
+
+    :param lines:
+    :param y:
+    :param x:
+    :return int:
+    """
+
+    ends = lines.word_index.boundaries(y)[1]
+    i = bisect.bisect_right(ends, x)
+    return ends[i] if i < len(ends) else len(lines[y])
+
+
+def previous_word_start(lines, y, x):
+    """
+    Get the offset of the start of the last word starting before `x` on
+    line `y`, or the start of the line if there is none.
+
+    :param lines:
+    :param y:
+    :param x:
+    :return int:
+    """
+
+    starts = lines.word_index.boundaries(y)[0]
+    i = bisect.bisect_left(starts, x) - 1
+    return starts[i] if i >= 0 else 0
+
+
 def string_insert(string, i, x):
     start = string[:i]
     finish = string[i:]
@@ -236,3 +603,608 @@ def update_line(string, interface):
     interface.lines[interface.line_no] = interface.current_line
     return
 
+
+
+# Line lengths are kept by LineIndex in blocks of about this many lines.
+LINE_BLOCK = 512
+
+
+def _fenwick(values):
+    """
+    Build a Fenwick tree over the values in linear time.
+
+    :param values:
+    :return array:
+    """
+
+    tree = array('q', [0])
+    tree.extend(values)
+    size = len(tree)
+    for i in range(1, size):
+        parent = i + (i & -i)
+        if parent < size:
+            tree[parent] += tree[i]
+    return tree
+
+
+def _fenwick_add(tree, i, delta):
+    i += 1
+    size = len(tree)
+    while i < size:
+        tree[i] += delta
+        i += i & -i
+
+
+def _fenwick_prefix(tree, i):
+    total = 0
+    while i > 0:
+        total += tree[i]
+        i -= i & -i
+    return total
+
+
+def _fenwick_find(tree, value):
+    """
+    Get how many of the values add up to no more than `value`, along with
+    what is left of `value` after them.
+
+    :param tree:
+    :param value:
+    :return tuple: count, rest
+    """
+
+    size = len(tree)
+    i = 0
+    step = 1
+    while step * 2 < size:
+        step *= 2
+    while step:
+        if i + step < size and tree[i + step] <= value:
+            i += step
+            value -= tree[i]
+        step //= 2
+    return i, value
+
+
+class LineIndex(object):
+    """
+    Index over the lengths of a Lines object so that absolute character
+    offsets can be mapped to and from x, y locations in O(log n).
+
+    Every line counts one extra character for the newline that separates it
+    from the next line. The lengths are kept in arrays of about LINE_BLOCK
+    lines, with Fenwick trees over the number of lines and characters in
+    each block. Editing, inserting or deleting lines only touches the
+    blocks they are in, and the trees are only rebuilt, over the blocks
+    rather than the lines, when a block is split or emptied. The index is
+    built in O(n) the first time it is queried.
+    """
+
+    def __init__(self, lines):
+        """
+        :param lines:
+        """
+
+        self.lines = lines
+        self.blocks = [array('q')]
+        # Characters in each block.
+        self.sums = [0]
+        self.count = 0
+        self.block_lines = _fenwick([0])
+        self.block_chars = _fenwick([0])
+        self.dirty = True
+
+    def rebuild(self):
+        """
+        Rebuild the index from the lines in linear time.
+
+        :return:
+        """
+
+        lengths = array('q', (len(line) + 1 for line in self.lines))
+        self.blocks = [lengths[i:i + LINE_BLOCK] for i in range(0, len(lengths), LINE_BLOCK)] or [array('q')]
+        self.sums = [sum(block) for block in self.blocks]
+        self.count = len(lengths)
+        self._rebuild_trees()
+        self.dirty = False
+        return self
+
+    def _rebuild_trees(self):
+        self.block_lines = _fenwick(len(block) for block in self.blocks)
+        self.block_chars = _fenwick(self.sums)
+
+    def memory(self):
+        """
+        Get the number of bytes used by the index.
+
+        :return int:
+        """
+
+        size = sys.getsizeof(self.blocks) + sys.getsizeof(self.sums)
+        size += sum(sys.getsizeof(block) for block in self.blocks)
+        return size + sys.getsizeof(self.block_lines) + sys.getsizeof(self.block_chars)
+
+    def _locate(self, i):
+        """
+        Get the block line `i` is in and its place in the block. The end of
+        the lines is at the end of the last block.
+
+        :param i:
+        :return tuple: block, place
+        """
+
+        b, k = _fenwick_find(self.block_lines, i)
+        if b == len(self.blocks):
+            b -= 1
+            k = len(self.blocks[b])
+        return b, k
+
+    def _resize(self, b, delta):
+        block = self.blocks[b]
+        self.sums[b] += delta
+        _fenwick_add(self.block_chars, b, delta)
+        return block
+
+    def line_changed(self, lines, i, old, new):
+        """
+        Observer hook for a single line being replaced.
+
+        :param lines:
+        :param i:
+        :param old:
+        :param new:
+        :return:
+        """
+
+        if self.dirty:
+            return
+        b, k = self._locate(i)
+        delta = len(new) - len(old)
+        self._resize(b, delta)[k] += delta
+
+    def lines_spliced(self, lines, start, old, new):
+        """
+        Observer hook for a run of lines being replaced by another.
+
+        :param lines:
+        :param start:
+        :param old:
+        :param new:
+        :return:
+        """
+
+        if self.dirty:
+            return
+        if len(old) == len(new):
+            for i, (old_line, new_line) in enumerate(zip(old, new)):
+                self.line_changed(lines, start + i, old_line, new_line)
+            return
+
+        first, place = self._locate(start)
+        b, k = first, place
+        remaining = len(old)
+        while remaining:
+            block = self.blocks[b]
+            n = min(remaining, len(block) - k)
+            if n:
+                self._resize(b, -sum(block[k:k + n]))
+                del block[k:k + n]
+                _fenwick_add(self.block_lines, b, -n)
+                remaining -= n
+            b, k = b + 1, 0
+        last = b
+
+        if new:
+            lengths = array('q', (len(line) + 1 for line in new))
+            self._resize(first, sum(lengths))[place:place] = lengths
+            _fenwick_add(self.block_lines, first, len(lengths))
+            last = max(last, first + 1)
+        self.count += len(new) - len(old)
+
+        # Split the blocks that grew too long and drop the empty ones.
+        touched = self.blocks[first:last]
+        if all(0 < len(block) <= 2 * LINE_BLOCK for block in touched):
+            return
+        blocks = []
+        for block in touched:
+            blocks.extend(block[i:i + LINE_BLOCK] for i in range(0, len(block), LINE_BLOCK))
+        self.blocks[first:last] = blocks
+        self.sums[first:last] = [sum(block) for block in blocks]
+        if not self.blocks:
+            self.blocks, self.sums = [array('q')], [0]
+        self._rebuild_trees()
+
+    def prefix(self, i):
+        """
+        Get the offset that line `i` starts at.
+
+        :param i:
+        :return int:
+        """
+
+        if self.dirty:
+            self.rebuild()
+
+        b, k = self._locate(i)
+        return _fenwick_prefix(self.block_chars, b) + sum(self.blocks[b][:k])
+
+    def total(self):
+        """
+        Get the number of characters in the lines, including newlines.
+
+        :return int:
+        """
+
+        if self.dirty:
+            self.rebuild()
+
+        return max(_fenwick_prefix(self.block_chars, len(self.blocks)) - 1, 0)
+
+    def find(self, offset):
+        """
+        Get the number of the line that contains the given offset.
+
+        :param offset:
+        :return int:
+        """
+
+        if self.dirty:
+            self.rebuild()
+
+        b, rest = _fenwick_find(self.block_chars, offset)
+        if b >= len(self.blocks):
+            return max(self.count - 1, 0)
+        line = _fenwick_prefix(self.block_lines, b) + bisect.bisect_right(list(accumulate(self.blocks[b])), rest)
+        return min(line, max(self.count - 1, 0))
+
+
+class WordIndex(object):
+    """
+    Cache of the word boundaries of the lines of a Lines object, by line
+    number. An edit drops the entries of the lines it touched, so a line is
+    only scanned again after it has been changed and old versions of a
+    line are not kept around.
+    """
+
+    def __init__(self, lines):
+        """
+        :param lines:
+        """
+
+        self.lines = lines
+        self.cache = {}
+
+    def boundaries(self, y):
+        """
+        Get the word boundaries of line `y`.
+
+        :param y:
+        :return tuple: starts, ends
+        """
+
+        try:
+            return self.cache[y]
+        except KeyError:
+            result = self.cache[y] = word_boundaries(self.lines[y])
+            return result
+
+    def line_changed(self, lines, i, old, new):
+        self.cache.pop(i, None)
+
+    def lines_spliced(self, lines, start, old, new):
+        if len(old) == len(new):
+            for i in range(start, start + len(old)):
+                self.cache.pop(i, None)
+            return
+        # Line numbers after the splice moved.
+        self.cache = {i: value for i, value in self.cache.items() if i < start}
+
+
+class ObservedLines(object):
+    """
+    Base for line containers that notify their observers whenever they are
+    modified.
+
+    Observers must provide `line_changed(lines, i, old, new)` for a single
+    line being replaced and `lines_spliced(lines, start, old, new)` for a run
+    of lines being replaced by another run. A LineIndex is always attached
+    as the `line_index` attribute and a WordIndex as `word_index`.
+    """
+
+    def _observe(self):
+        self.observers = []
+        self.line_index = LineIndex(self)
+        self.word_index = WordIndex(self)
+        self.observers.append(self.line_index)
+        self.observers.append(self.word_index)
+
+    def _changed(self, i, old, new):
+        for observer in self.observers:
+            observer.line_changed(self, i, old, new)
+
+    def _spliced(self, start, old, new):
+        for observer in self.observers:
+            observer.lines_spliced(self, start, old, new)
+
+
+class Lines(ObservedLines, list):
+    """
+    List of lines that notifies its observers whenever it is modified.
+    """
+
+    def __init__(self, iterable=()):
+        list.__init__(self, iterable)
+        self._observe()
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            value = list(value)
+            if step != 1:
+                old = list(self)
+                list.__setitem__(self, key, value)
+                self._spliced(0, old, list(self))
+                return
+            old = list.__getitem__(self, key)
+            list.__setitem__(self, key, value)
+            self._spliced(start, old, value)
+            return
+
+        i = key + len(self) if key < 0 else key
+        old = list.__getitem__(self, i)
+        list.__setitem__(self, i, value)
+        self._changed(i, old, value)
+
+    def __delitem__(self, key):
+        if not isinstance(key, slice):
+            key = key + len(self) if key < 0 else key
+            key = slice(key, key + 1)
+        self.__setitem__(key, [])
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, n):
+        self[:] = list(self) * n
+        return self
+
+    def append(self, line):
+        self.insert(len(self), line)
+
+    def extend(self, lines):
+        end = len(self)
+        self[end:end] = lines
+
+    def insert(self, i, line):
+        i = max(0, min(i + len(self) if i < 0 else i, len(self)))
+        self[i:i] = [line]
+
+    def pop(self, i=-1):
+        if not self:
+            raise IndexError('pop from empty list')
+        i = i + len(self) if i < 0 else i
+        line = list.__getitem__(self, i)
+        del self[i]
+        return line
+
+    def remove(self, line):
+        del self[list.index(self, line)]
+
+    def clear(self):
+        del self[:]
+
+    def sort(self, *args, **kwargs):
+        old = list(self)
+        list.sort(self, *args, **kwargs)
+        self._spliced(0, old, list(self))
+
+    def reverse(self):
+        old = list(self)
+        list.reverse(self)
+        self._spliced(0, old, list(self))
+
+
+class CompactLines(ObservedLines, MutableSequence):
+    """
+    Read-mostly lines stored as a single string plus an array of the offsets
+    each line starts at, instead of one str object per line.
+
+    Lines that are edited are promoted to an overlay list. Once the lines are
+    modified an `order` array maps each line number either to a line of the
+    original text (>= 0) or to a slot in the overlay (< 0, as `~slot`).
+    """
+
+    def __init__(self, text=''):
+        self.text = text
+        self.offsets = array('Q', [0])
+        i = text.find('\n')
+        while i != -1:
+            self.offsets.append(i + 1)
+            i = text.find('\n', i + 1)
+
+        self.order = None
+        self.overlay = []
+        self.free_slots = []
+        self._observe()
+
+    def _base_line(self, i):
+        start = self.offsets[i]
+        if i + 1 < len(self.offsets):
+            return self.text[start:self.offsets[i + 1] - 1]
+        return self.text[start:]
+
+    def _line(self, i):
+        if self.order is None:
+            return self._base_line(i)
+        ref = self.order[i]
+        return self._base_line(ref) if ref >= 0 else self.overlay[~ref]
+
+    def _promote(self, line):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.overlay[slot] = line
+        else:
+            slot = len(self.overlay)
+            self.overlay.append(line)
+        return ~slot
+
+    def _release(self, ref):
+        if ref < 0:
+            self.overlay[~ref] = None
+            self.free_slots.append(~ref)
+
+    def _materialize_order(self):
+        if self.order is None:
+            self.order = array('q', range(len(self.offsets)))
+
+    def __len__(self):
+        return len(self.offsets) if self.order is None else len(self.order)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._line(i)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._line(i) for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('line index out of range')
+        return self._line(key)
+
+    def __setitem__(self, key, value):
+        self._materialize_order()
+
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('CompactLines does not support extended slices')
+            stop = max(start, stop)
+            old = self[start:stop]
+            value = list(value)
+            for ref in self.order[start:stop]:
+                self._release(ref)
+            self.order[start:stop] = array('q', [self._promote(line) for line in value])
+            self._spliced(start, old, value)
+            return
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('line assignment index out of range')
+        old = self._line(key)
+        ref = self.order[key]
+        if ref < 0:
+            self.overlay[~ref] = value
+        else:
+            self.order[key] = self._promote(value)
+        self._changed(key, old, value)
+
+    def __delitem__(self, key):
+        if not isinstance(key, slice):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError('line index out of range')
+            key = slice(key, key + 1)
+        self.__setitem__(key, [])
+
+    def insert(self, i, line):
+        i = max(0, min(i + len(self) if i < 0 else i, len(self)))
+        self[i:i] = [line]
+
+    def extend(self, lines):
+        end = len(self)
+        self[end:end] = lines
+
+    def memory(self):
+        """
+        Get the number of bytes used to store the lines, including the
+        offset index.
+
+        :return int:
+        """
+
+        size = sys.getsizeof(self.text)
+        for arr in (self.offsets, self.order):
+            if arr is not None:
+                size += sys.getsizeof(arr)
+        size += sys.getsizeof(self.overlay) + sys.getsizeof(self.free_slots)
+        size += sum(sys.getsizeof(line) for line in self.overlay if line is not None)
+        return size + self.line_index.memory()
+
+
+class RingLines(ObservedLines):
+    """
+    Read-only lines kept in a ring buffer. Once `cap` lines are held, adding
+    more drops the oldest ones.
+    """
+
+    def __init__(self, cap):
+        """
+        :param int cap: Maximum number of lines kept.
+        """
+
+        self.cap = cap
+        self.ring = deque(maxlen=cap)
+        self._observe()
+
+    def __len__(self):
+        return len(self.ring)
+
+    def __iter__(self):
+        return iter(self.ring)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.ring[i] for i in range(*key.indices(len(self.ring)))]
+        return self.ring[key]
+
+    def extend(self, lines):
+        """
+        Add a batch of lines to the end, dropping the oldest lines that no
+        longer fit.
+
+        :param lines:
+        :return:
+        """
+
+        lines = list(lines)[-self.cap:]
+        evict = max(0, len(self.ring) + len(lines) - self.cap)
+        if evict:
+            old = [self.ring.popleft() for _ in range(evict)]
+            self._spliced(0, old, [])
+
+        start = len(self.ring)
+        self.ring.extend(lines)
+        self._spliced(start, [], lines)
+        return self
+
+
+def line_memory(lines):
+    """
+    Report how many bytes the lines and their offset index use, next to
+    what the same lines would use stored as a list with one str per line.
+
+    :param lines:
+    :return dict:
+    """
+
+    count = len(lines)
+    list_bytes = sys.getsizeof([None] * count) + sum(sys.getsizeof(line) for line in lines)
+    if isinstance(lines, CompactLines):
+        used = lines.memory()
+    elif isinstance(lines, ObservedLines):
+        used = list_bytes + lines.line_index.memory()
+    else:
+        used = list_bytes
+
+    return {
+        'lines': count,
+        'bytes': used,
+        'bytes_per_line': used / count if count else 0.0,
+        'list_bytes': list_bytes,
+        'list_bytes_per_line': list_bytes / count if count else 0.0,
+    }
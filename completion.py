@@ -0,0 +1,242 @@
+import curses
+import heapq
+import re
+from collections import Counter
+
+from common import WORD_PATTERN
+
+# The part of a word before the cursor that is completed.
+COMPLETION_PREFIX = re.compile(r'\w+$')
+
+
+class TrieNode(object):
+    """
+    Node of the completion trie. `count` is how many times the word ending
+    at the node appears, and `top` caches the best completions below the
+    node as (-count, word) tuples until a word below it changes.
+    """
+
+    __slots__ = ('children', 'count', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.count = 0
+        self.top = None
+
+
+class CompletionIndex(object):
+    """
+    Prefix trie of the words in a Lines object, weighted by how often each
+    word appears.
+
+    The index observes the lines, so only the words of edited lines are
+    counted again. Each node caches its `k` most frequent completions and
+    an edit only clears the caches on the path of the words it changed, so
+    a lookup walks the prefix and at most merges the cached lists of the
+    children of the nodes that were cleared.
+
+    At most `max_words` distinct words are kept. When there are more, the
+    rarest `evict_fraction` of them are dropped. Dropped words are counted
+    from scratch if they are typed again.
+    """
+
+    def __init__(self, lines, k=9, max_words=100000, min_length=3, max_length=64, evict_fraction=0.1):
+        """
+        :param lines:
+        :param int k: Number of completions cached per node.
+        :param int max_words: Most distinct words kept.
+        :param int min_length: Shortest word that is indexed.
+        :param int max_length: Longest word that is indexed.
+        :param evict_fraction: Fraction of the words dropped when full.
+        """
+
+        self.lines = lines
+        self.k = k
+        self.max_words = max_words
+        self.min_length = min_length
+        self.max_length = max_length
+        self.evict_fraction = evict_fraction
+        self.root = TrieNode()
+        self.counts = {}
+
+        self._update(Counter(self._words(lines)))
+        lines.observers.append(self)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def detach(self):
+        if self in self.lines.observers:
+            self.lines.observers.remove(self)
+
+    def _words(self, lines):
+        min_length, max_length = self.min_length, self.max_length
+        for line in lines:
+            for word in WORD_PATTERN.findall(line):
+                if min_length <= len(word) <= max_length:
+                    yield word
+
+    def _add(self, word, delta):
+        node = self.root
+        path = [node]
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                if delta < 0:
+                    # The word was evicted.
+                    return
+                child = node.children[char] = TrieNode()
+            node = child
+            path.append(node)
+
+        if delta < 0 and not node.count:
+            return
+        node.count = max(node.count + delta, 0)
+
+        if node.count:
+            self.counts[word] = node.count
+        else:
+            self.counts.pop(word, None)
+
+        for node in path:
+            node.top = None
+
+        # Prune the nodes left without words.
+        for depth in range(len(word), 0, -1):
+            node = path[depth]
+            if node.count or node.children:
+                break
+            del path[depth - 1].children[word[depth - 1]]
+
+    def _update(self, deltas):
+        for word, delta in deltas.items():
+            if delta:
+                self._add(word, delta)
+
+        if len(self.counts) > self.max_words:
+            self._evict()
+
+    def _evict(self):
+        count = max(len(self.counts) - self.max_words, int(self.max_words * self.evict_fraction))
+        for word in heapq.nsmallest(count, self.counts, key=self.counts.get):
+            self._add(word, -self.counts[word])
+
+    def line_changed(self, lines, i, old, new):
+        deltas = Counter(self._words([new]))
+        deltas.subtract(self._words([old]))
+        self._update(deltas)
+
+    def lines_spliced(self, lines, start, old, new):
+        deltas = Counter(self._words(new))
+        deltas.subtract(self._words(old))
+        self._update(deltas)
+
+    def _top(self, node, prefix):
+        if node.top is not None:
+            return node.top
+
+        candidates = []
+        if node.count:
+            candidates.append((-node.count, prefix))
+        for char, child in node.children.items():
+            candidates.extend(self._top(child, prefix + char))
+        node.top = heapq.nsmallest(self.k, candidates)
+        return node.top
+
+    def complete(self, prefix, k=None):
+        """
+        Get the most frequent words starting with `prefix`, leaving out the
+        prefix itself.
+
+        :param str prefix:
+        :param int k: Number of words, at most the number cached per node.
+        :return list: Words, most frequent first.
+        """
+
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+
+        words = [word for count, word in self._top(node, prefix) if word != prefix]
+        return words[:k or self.k]
+
+
+class CompletionPopup(object):
+    """
+    List of completions drawn under the word being completed.
+
+    While the popup is open the interface passes key presses to `key`
+    first. A number picks that completion, Enter or Tab picks the selected
+    one and the arrow keys move the selection. Escape closes the popup and
+    any other key closes it and is then handled as usual.
+    """
+
+    def __init__(self, interface, prefix, words):
+        self.interface = interface
+        self.prefix = prefix
+        self.words = words
+        self.selected = 0
+        self.x, self.y = interface.cursor.x, interface.line_no
+
+        height, width = interface.stdscr.getmaxyx()
+        self.width = min(max(len(word) for word in words) + 3, width - 1)
+        self.column = max(min(self.x - len(prefix), width - 1 - self.width), 0)
+        # Open upwards when there is no room below the line.
+        if self.y + len(words) < height - 1:
+            self.rows = range(self.y + 1, self.y + 1 + len(words))
+        else:
+            self.rows = range(max(self.y - len(words), 0), self.y)
+
+    def draw(self):
+        screen = self.interface.stdscr
+        for i, (row, word) in enumerate(zip(self.rows, self.words)):
+            screen.addstr(row, self.column, '{} {}'.format(i + 1, word).ljust(self.width)[:self.width])
+        screen.chgat(self.rows[self.selected], self.column, self.width, curses.A_REVERSE)
+        screen.move_cursor(self.x, self.y)
+        return self
+
+    def close(self):
+        """
+        Draw the lines back over the popup.
+
+        :return:
+        """
+
+        interface = self.interface
+        interface.popup = None
+        for row in self.rows:
+            line = interface.lines[row] if row < len(interface.lines) else ''
+            interface.stdscr.addstr(row, self.column, line[self.column:self.column + self.width].ljust(self.width))
+        interface.stdscr.move_cursor(self.x, self.y)
+        return self
+
+    def accept(self, i):
+        self.close()
+        self.interface.insert_text(self.words[i][len(self.prefix):], at=(self.x, self.y))
+        return True
+
+    def key(self, ch):
+        """
+        Handle a key press while the popup is open.
+
+        :param ch:
+        :return bool: Whether the key was used by the popup.
+        """
+
+        # Reading keys without delay gives -1 when there was no key.
+        if ch == -1:
+            return True
+        if ord('1') <= ch < ord('1') + len(self.words):
+            return self.accept(ch - ord('1'))
+        if ch in (9, 10, 13, curses.KEY_ENTER):
+            return self.accept(self.selected)
+        if ch in (curses.KEY_DOWN, curses.KEY_UP):
+            step = 1 if ch == curses.KEY_DOWN else -1
+            self.selected = (self.selected + step) % len(self.words)
+            self.draw()
+            return True
+
+        self.close()
+        return ch == 27
@@ -0,0 +1,496 @@
+import bisect
+import curses
+import os
+from collections import Counter
+
+# Lines are compared in chunks of this size before falling back to
+# comparing them one at a time.
+CHUNK = 4096
+
+# Most lines tried as anchors in a single range.
+MAX_ANCHORS = 4096
+
+# The hasher is pruned once it holds this many times more lines than the
+# file and the buffer, plus the slack.
+PRUNE_FACTOR = 2
+PRUNE_SLACK = 10000
+
+
+class LineHasher(object):
+    """
+    Give every distinct line an integer id so that lines can be compared by
+    id. The str hash is cached by Python, so a line is only hashed once.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __call__(self, line):
+        try:
+            return self.ids[line]
+        except KeyError:
+            line_id = self.ids[line] = self.next_id
+            self.next_id += 1
+            return line_id
+
+    def many(self, lines):
+        return [self(line) for line in lines]
+
+    def prune(self, live):
+        """
+        Forget the lines whose ids are not in `live`. Ids are never given
+        out twice, so the ids that are kept stay valid.
+
+        :param set live:
+        :return:
+        """
+
+        self.ids = {line: line_id for line, line_id in self.ids.items() if line_id in live}
+        return self
+
+
+class LineHashes(object):
+    """
+    Observer keeping the ids of a Lines object up to date, so that only the
+    lines that were edited are hashed again.
+
+    Edits made since the last diff are summed up in `changed` as a
+    (start, end, delta) tuple: the range of edited lines in the current line
+    numbers and the number of lines added overall.
+    """
+
+    def __init__(self, lines, hasher):
+        self.lines = lines
+        self.hasher = hasher
+        self.ids = hasher.many(lines)
+        self.changed = None
+        lines.observers.append(self)
+
+    @property
+    def dirty(self):
+        return self.changed is not None
+
+    def detach(self):
+        if self in self.lines.observers:
+            self.lines.observers.remove(self)
+
+    def _mark(self, start, old_count, new_count):
+        delta = new_count - old_count
+        if self.changed is None:
+            self.changed = (start, start + new_count, delta)
+            return
+
+        first, last, total = self.changed
+        if last > start:
+            last = max(last + delta, start + new_count)
+        else:
+            last = start + new_count
+        self.changed = (min(first, start), last, total + delta)
+
+    def line_changed(self, lines, i, old, new):
+        self.ids[i] = self.hasher(new)
+        self._mark(i, 1, 1)
+
+    def lines_spliced(self, lines, start, old, new):
+        self.ids[start:start + len(old)] = self.hasher.many(new)
+        self._mark(start, len(old), len(new))
+
+
+def _common_prefix(a, b, a0, a1, b0, b1):
+    n = 0
+    limit = min(a1 - a0, b1 - b0)
+    while n + CHUNK <= limit and a[a0 + n:a0 + n + CHUNK] == b[b0 + n:b0 + n + CHUNK]:
+        n += CHUNK
+    while n < limit and a[a0 + n] == b[b0 + n]:
+        n += 1
+    return n
+
+
+def _common_suffix(a, b, a0, a1, b0, b1):
+    n = 0
+    limit = min(a1 - a0, b1 - b0)
+    while n + CHUNK <= limit and a[a1 - n - CHUNK:a1 - n] == b[b1 - n - CHUNK:b1 - n]:
+        n += CHUNK
+    while n < limit and a[a1 - n - 1] == b[b1 - n - 1]:
+        n += 1
+    return n
+
+
+def _unique_anchors(a, b, a0, a1, b0, b1):
+    """
+    Get the longest increasing run of lines that appear exactly once in
+    both ranges, as (i, j) pairs.
+
+    Long ranges only try every so many lines of `a` as anchors, since the
+    lines between the anchors are diffed again anyway. All of them are
+    tried when that finds none.
+    """
+
+    a_slice, b_slice = a[a0:a1], b[b0:b1]
+    a_counts, b_counts = Counter(a_slice), Counter(b_slice)
+    b_positions = dict(zip(b_slice, range(b0, b1)))
+
+    step = max((a1 - a0) // MAX_ANCHORS, 1)
+    while True:
+        pairs = [
+            (i, b_positions[line])
+            for i, line in zip(range(a0, a1, step), a_slice[::step])
+            if a_counts[line] == 1 and b_counts.get(line) == 1
+        ]
+        if pairs or step == 1:
+            break
+        step = 1
+    if not pairs:
+        return []
+
+    # Longest increasing subsequence of j by patience sorting.
+    tails, tail_index, previous = [], [], [None] * len(pairs)
+    for index, (i, j) in enumerate(pairs):
+        pile = bisect.bisect_left(tails, j)
+        if pile:
+            previous[index] = tail_index[pile - 1]
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pile] = j
+            tail_index[pile] = index
+
+    anchors = []
+    index = tail_index[-1]
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+class _Budget(object):
+    """
+    Edits Myers' algorithm may still spend on a diff. Once they run out,
+    `exhausted_at` holds the a, b location the diff stopped at.
+    """
+
+    def __init__(self, edits):
+        self.edits = edits
+        self.exhausted_at = None
+
+
+def _myers(a, b, a0, a1, b0, b1, hunks, budget):
+    """
+    Diff the ranges with Myers' algorithm, spending edits from the budget.
+    When the budget runs out the diff stops at the start of the range.
+    """
+
+    n, m = a1 - a0, b1 - b0
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, budget.edits) + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[a0 + x] == b[b0 + y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+    else:
+        budget.edits = 0
+        budget.exhausted_at = (a0, b0)
+        return
+    budget.edits -= len(trace) - 1
+
+    # Walk back through the trace collecting the matched diagonals.
+    snakes = []
+    x, y = n, m
+    for d in range(len(trace) - 1, 0, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            previous_k = k + 1
+        else:
+            previous_k = k - 1
+        previous_x = v[previous_k]
+        previous_y = previous_x - previous_k
+        start_x = previous_x if previous_k == k + 1 else previous_x + 1
+        start_y = start_x - k
+        if x > start_x:
+            snakes.append((start_x, start_y, x - start_x))
+        x, y = previous_x, previous_y
+    if x > 0:
+        snakes.append((0, 0, x))
+    snakes.reverse()
+
+    i = j = 0
+    for x, y, length in snakes + [(n, m, 0)]:
+        if x > i or y > j:
+            hunks.append((a0 + i, a0 + x, b0 + j, b0 + y))
+        i, j = x + length, y + length
+
+
+def _diff(a, b, a0, a1, b0, b1, hunks, budget):
+    if budget.exhausted_at is not None:
+        return
+
+    prefix = _common_prefix(a, b, a0, a1, b0, b1)
+    a0, b0 = a0 + prefix, b0 + prefix
+    suffix = _common_suffix(a, b, a0, a1, b0, b1)
+    a1, b1 = a1 - suffix, b1 - suffix
+
+    if a0 == a1 or b0 == b1:
+        if a0 < a1 or b0 < b1:
+            hunks.append((a0, a1, b0, b1))
+        return
+
+    anchors = _unique_anchors(a, b, a0, a1, b0, b1)
+    if not anchors:
+        _myers(a, b, a0, a1, b0, b1, hunks, budget)
+        return
+
+    i, j = a0, b0
+    for anchor_i, anchor_j in anchors:
+        if anchor_i > i or anchor_j > j:
+            _diff(a, b, i, anchor_i, j, anchor_j, hunks, budget)
+        i, j = anchor_i + 1, anchor_j + 1
+    _diff(a, b, i, a1, j, b1, hunks, budget)
+
+
+def _diff_range(a, b, a0, a1, b0, b1, max_cost):
+    """
+    Diff the ranges within a budget of `max_cost` edits. Everything from
+    where the budget ran out to the end of the ranges is one hunk.
+    """
+
+    hunks = []
+    budget = _Budget(max_cost)
+    _diff(a, b, a0, a1, b0, b1, hunks, budget)
+    if budget.exhausted_at is not None:
+        i, j = budget.exhausted_at
+        suffix = _common_suffix(a, b, i, a1, j, b1)
+        hunks.append((i, a1 - suffix, j, b1 - suffix))
+    return hunks
+
+
+def diff(a, b, max_cost=2000):
+    """
+    Diff two sequences of line ids with a patience diff, using Myers'
+    algorithm between the anchors.
+
+    :param a: Ids of the old lines.
+    :param b: Ids of the new lines.
+    :param max_cost: Edits Myers' algorithm may spend on the whole diff.
+        Once they are spent, the rest is reported as a single hunk.
+    :return list: Hunks as (a_start, a_end, b_start, b_end) tuples.
+    """
+
+    return _merge(_diff_range(a, b, 0, len(a), 0, len(b), max_cost))
+
+
+def _merge(hunks):
+    """
+    Join hunks that touch each other.
+    """
+
+    merged = []
+    for hunk in hunks:
+        if merged and merged[-1][1] == hunk[0] and merged[-1][3] == hunk[2]:
+            merged[-1] = (merged[-1][0], hunk[1], merged[-1][2], hunk[3])
+        else:
+            merged.append(hunk)
+    return merged
+
+
+def rediff(a, b, hunks, changed, max_cost=2000):
+    """
+    Update the hunks of a previous diff after the lines of `b` between
+    `start` and `end` were edited, without comparing the rest of the lines.
+
+    Outside of the hunks the lines of `a` and `b` line up one to one, so
+    only the edited range, widened to take in the hunks it touches, is
+    diffed again. The hunks after it are shifted by the number of lines
+    that were added.
+
+    :param a: Ids of the old lines.
+    :param b: Ids of the new lines, after the edits.
+    :param hunks: Hunks of the previous diff.
+    :param changed: (start, end, delta) of the edits, in `b` line numbers.
+    :param max_cost: Edits Myers' algorithm may spend on the edited range.
+    :return list: Hunks as (a_start, a_end, b_start, b_end) tuples.
+    """
+
+    start, end, delta = changed
+    # The end of the edited range before the edits.
+    old_end = max(end - delta, start)
+
+    before, touched, after = [], [], []
+    for hunk in hunks:
+        if hunk[3] < start:
+            before.append(hunk)
+        elif hunk[2] > old_end:
+            after.append(hunk)
+        else:
+            touched.append(hunk)
+
+    b_start = min([start] + [hunk[2] for hunk in touched])
+    b_end = max([old_end] + [hunk[3] for hunk in touched])
+
+    # Map the ends of the range back onto `a` through the hunks before them.
+    previous = before[-1] if before else (0, 0, 0, 0)
+    a_start = previous[1] + b_start - previous[3]
+    previous = touched[-1] if touched else previous
+    a_end = previous[1] + b_end - previous[3]
+
+    middle = _diff_range(a, b, a_start, a_end, b_start, b_end + delta, max_cost)
+    after = [(a0, a1, b0 + delta, b1 + delta) for a0, a1, b0, b1 in after]
+    return _merge(before + middle + after)
+
+
+class DiffView(object):
+    """
+    Compare the lines of an Interface against the file they were loaded
+    from and mark the changed lines.
+
+    The file is only read again when it changes on disk, and the ids of the
+    lines are kept up to date as they are edited, so diffing again after an
+    edit only compares ids. Lines that are no longer in the file or the
+    buffer are dropped from the hasher when the file is read again, or once
+    edits have piled up enough of them. Changed and added lines get a reversed first
+    column and the line after removed lines gets an underlined first column,
+    since the interface has no gutter to draw in.
+    """
+
+    def __init__(self, interface, path):
+        self.interface = interface
+        self.path = path
+        self.hasher = LineHasher()
+        self.file_ids = []
+        self.file_stamp = None
+        self.hashes = LineHashes(interface.lines, self.hasher)
+        self.hunks = []
+
+    def close(self):
+        self.hashes.detach()
+
+    def _load_file(self):
+        stat = os.stat(self.path)
+        stamp = (stat.st_mtime, stat.st_size)
+        if stamp == self.file_stamp:
+            return False
+
+        with open(self.path) as f:
+            self.file_ids = self.hasher.many(f.read().split('\n'))
+        self.file_stamp = stamp
+        self._prune()
+        return True
+
+    def _prune(self):
+        """
+        Drop the lines only old versions of the file or of edited lines
+        had from the hasher.
+
+        :return:
+        """
+
+        live = set(self.file_ids)
+        live.update(self.hashes.ids)
+        self.hasher.prune(live)
+
+    def update(self):
+        """
+        Diff the lines against the file again if either of them changed.
+
+        :return list: The hunks.
+        """
+
+        # The interface may have been given a new lines object.
+        if self.hashes.lines is not self.interface.lines:
+            self.hashes.detach()
+            self.hashes = LineHashes(self.interface.lines, self.hasher)
+
+        if self._load_file():
+            self.hunks = diff(self.file_ids, self.hashes.ids)
+        elif self.hashes.dirty:
+            self.hunks = rediff(self.file_ids, self.hashes.ids, self.hunks, self.hashes.changed)
+            # Every edit of a line interns a new version of it.
+            if len(self.hasher) > PRUNE_FACTOR * (len(self.file_ids) + len(self.hashes.ids)) + PRUNE_SLACK:
+                self._prune()
+        self.hashes.changed = None
+        return self.hunks
+
+    def draw(self):
+        """
+        Mark the changed lines that are on the screen.
+
+        :return:
+        """
+
+        screen = self.interface.stdscr
+        height = screen.getmaxyx()[0]
+        line_count = len(self.interface.lines)
+        for a0, a1, b0, b1 in self.hunks:
+            if b0 >= height:
+                break
+            if b0 == b1:
+                if b0 < line_count:
+                    screen.chgat(b0, 0, 1, curses.A_UNDERLINE)
+                continue
+            for y in range(b0, min(b1, height)):
+                screen.chgat(y, 0, 1, curses.A_REVERSE)
+
+        screen.move_cursor(self.interface.cursor.x, self.interface.line_no)
+        return self
+
+    def refresh(self):
+        """
+        Diff again if needed and draw the marks, but only when something
+        was drawn or edited since the last time.
+
+        :return:
+        """
+
+        screen = self.interface.stdscr
+        if not (self.hashes.dirty or screen.ops or screen.changed) and self.hashes.lines is self.interface.lines:
+            return self
+        self.update()
+        return self.draw()
+
+    def next_hunk(self):
+        """
+        Move the cursor to the start of the next hunk after the current line,
+        wrapping around to the first one.
+
+        The lines are drawn from the first row without scrolling, so only the
+        hunks that start on the screen can be jumped to. When there are more
+        below the screen, wrapping around says where the next one is.
+
+        :return:
+        """
+
+        hunks = self.update()
+        height = self.interface.stdscr.getmaxyx()[0]
+        starts = [min(b0, len(self.interface.lines) - 1) for a0, a1, b0, b1 in hunks]
+        visible = [start for start in starts if start < height]
+
+        i = bisect.bisect_right(visible, self.interface.line_no)
+        if i < len(visible):
+            self.interface.goto_line(visible[i])
+            return self
+
+        if visible:
+            self.interface.goto_line(visible[0])
+        if len(visible) < len(starts):
+            self.interface.show_message('{} more changes below the screen, the next at line {}'.format(
+                len(starts) - len(visible), starts[len(visible)] + 1))
+        return self
@@ -0,0 +1,177 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+import time
+
+from common import RingLines
+
+
+# inotify flags, see inotify(7).
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+
+def inotify_watch(path):
+    """
+    Get a non-blocking inotify file descriptor watching the file at `path`
+    for changes, or None when inotify is not available.
+
+    :param path:
+    :return int:
+    """
+
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+
+    mask = IN_MODIFY | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF
+    if libc.inotify_add_watch(fd, os.fsencode(path), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class Follower(object):
+    """
+    Follow a growing file and show its last lines on an Interface, like
+    `tail -f`.
+
+    New data is read in batches of at most `batch_bytes` per poll so that a
+    file growing faster than it can be shown does not hold up key presses.
+    Lines are kept in a RingLines holding at most `cap` lines, and drawing
+    only touches the rows the new lines scroll onto the screen.
+    """
+
+    def __init__(self, interface, path, cap=100000, interval=0.1, batch_bytes=1 << 20, tail_bytes=1 << 20):
+        """
+        :param interface:
+        :param path:
+        :param cap: Maximum number of lines kept.
+        :param interval: Seconds between checks when polling without inotify.
+        :param batch_bytes: Maximum bytes read per poll.
+        :param tail_bytes: How far back from the end of the file to start.
+        """
+
+        self.interface = interface
+        self.path = path
+        self.lines = RingLines(cap)
+        self.interval = interval
+        self.batch_bytes = batch_bytes
+
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.position = max(0, size - tail_bytes)
+        self.file.seek(self.position)
+        # Starting part way through the file means the first line is cut.
+        self.skip_partial = self.position > 0
+        self.partial = b''
+
+        self.inotify = inotify_watch(path)
+        self.last_check = 0.0
+        self.behind = True
+        self.shown = 0
+
+    def close(self):
+        self.file.close()
+        if self.inotify is not None:
+            os.close(self.inotify)
+            self.inotify = None
+
+    def _due(self):
+        if self.behind:
+            return True
+
+        if self.inotify is not None:
+            try:
+                return bool(os.read(self.inotify, 4096))
+            except BlockingIOError:
+                return False
+
+        return time.time() - self.last_check >= self.interval
+
+    def poll(self):
+        """
+        Read a batch of new lines from the file if there are any, add them
+        to the lines and draw them.
+
+        :return int: Number of new lines.
+        """
+
+        if not self._due():
+            return 0
+        self.last_check = time.time()
+
+        # Start over when the file was truncated.
+        if os.fstat(self.file.fileno()).st_size < self.position:
+            self.file.seek(0)
+            self.position = 0
+            self.partial = b''
+
+        data = self.file.read(self.batch_bytes)
+        self.position += len(data)
+        self.behind = len(data) == self.batch_bytes
+        if not data:
+            return 0
+
+        chunks = (self.partial + data).split(b'\n')
+        self.partial = chunks.pop()
+        if self.skip_partial and chunks:
+            self.skip_partial = False
+            chunks.pop(0)
+        if not chunks:
+            return 0
+
+        new_lines = [chunk.decode('utf-8', 'replace').rstrip('\r') for chunk in chunks]
+        self.lines.extend(new_lines)
+        self.render(len(new_lines))
+        return len(new_lines)
+
+    def render(self, count=None):
+        """
+        Draw the last lines. When `count` new lines were added and they fit
+        on the screen, the screen is scrolled and only their rows are drawn,
+        otherwise every row is drawn again.
+
+        :param count:
+        :return:
+        """
+
+        interface = self.interface
+        screen = interface.stdscr
+        height, width = screen.getmaxyx()
+        shown = min(height, len(self.lines))
+
+        if count is None or count >= shown:
+            screen.erase()
+            first_row = 0
+        else:
+            # The rows move up by however many lines went off the top,
+            # whether they scrolled off the screen or were evicted.
+            overflow = self.shown + count - shown
+            if overflow > 0:
+                screen.scroll(overflow)
+            first_row = shown - count
+
+        # Keep clear of the bottom right corner, curses can't write there.
+        first_line = len(self.lines) - shown
+        for row in range(first_row, shown):
+            screen.addstr(row, 0, self.lines[first_line + row][:width - 1])
+        self.shown = shown
+
+        if self.lines:
+            interface.line_no = len(self.lines) - 1
+            interface.current_line = self.lines[-1]
+        screen.move_cursor(0, max(shown - 1, 0))
+        return self
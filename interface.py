@@ -1,19 +1,24 @@
 import curses
-from common import Cursor, Mouse, Screen
+import os
+from common import CompactLines, Cursor, CursorSet, Lines, Mouse, Screen, line_memory
+from completion import COMPLETION_PREFIX, CompletionIndex, CompletionPopup
+from diff import DiffView
+from follow import Follower
+from profiler import PROFILE_ENV, process_profiler
 
 
 class Interface(object):
     """
     A class to facilitate the creation of text interfaces with curses.
     """
-    def __init__(self, stdscr, callbacks=None):
-        self.curses = curses
+    def __init__(self, stdscr, callbacks=None, curses_module=None):
+        # Any object providing the curses functions used by the
+        # interface can stand in for the curses module.
+        self.curses = curses if curses_module is None else curses_module
         self.curses.cbreak()
         self.curses.noecho()
         self.pad_pos = 0
 
-        self.debug_pad = stdscr.subpad(0, 80)
-
         if callbacks is None:
             self.callbacks = {}
         else:
@@ -22,16 +27,29 @@ class Interface(object):
             self.callbacks = callbacks
 
         self.cursor = Cursor(0, 0)
+        self.cursors = CursorSet()
         self.mouse = Mouse(0, 0, 0, 0, 0)
+        self.profiler = process_profiler()
 
         self.current_line = ''
         self.ch = 0
         self.line_no = 0
         self.lines = ['']
+        self.path = None
+        self.read_only = False
+        self.follower = None
+        self.diff_view = None
+        self.completion_index = None
+        self.popup = None
         self.stdscr = Screen(stdscr)
         self.stdscr.cursor = self.cursor
+        self.stdscr.curses = self.curses
         self.stdscr.keypad(True)
 
+        # Draw the debug info through the screen so that it is
+        # written out in the same frame as everything else.
+        self.debug_pad = self.stdscr.subpad(0, 80)
+
     def __del__(self):
         self.curses.nocbreak()
         self.stdscr.keypad(False)
@@ -47,19 +65,559 @@ class Interface(object):
             # an attribute is set.
             pass
 
+        # Keep the lines observable so that the offset
+        # index stays up to date with every edit.
+        if key == 'lines' and type(value) == list:
+            value = Lines(value)
+
         object.__setattr__(self, key, value)
 
     def refresh(self):
         """
-        Refresh the screen by clearing it and printing all the lines out again.
+        Refresh the screen by erasing it and printing all the lines out again.
 
         :return:
         """
 
-        self.stdscr.clear()
+        if self.follower is not None:
+            self.follower.render()
+            return self
+
+        # Erase rather than clear, clear makes curses repaint the whole
+        # terminal on the next update instead of only the changed cells.
+        self.stdscr.erase()
         self.stdscr.addstr('\n\r'.join(self.lines))
         return self
 
+    def load_text(self, text, compact=False):
+        """
+        Replace the lines with the given text and move the cursor to the start.
+
+        With `compact` the text is kept in a single string with an array of
+        line offsets instead of one str per line, which uses far less memory
+        for large documents that are mostly read.
+
+        :param str text:
+        :param bool compact:
+        :return:
+        """
+
+        self.lines = CompactLines(text) if compact else text.split('\n')
+        self.cursors.clear()
+        self._set_position(0, 0)
+        self.refresh()
+        self.stdscr.move_cursor(0, 0)
+        return self
+
+    def open(self, path, compact=False):
+        """
+        Load the file at the given path into the lines.
+
+        :param path:
+        :param bool compact:
+        :return:
+        """
+
+        with open(path) as f:
+            text = f.read()
+        self.path = path
+        return self.load_text(text, compact=compact)
+
+    def follow(self, path, cap=100000, interval=0.1):
+        """
+        Show the end of the file at `path` and keep adding the lines written
+        to it. The interface is read only until `unfollow` is called.
+
+        :param path:
+        :param int cap: Maximum number of lines kept.
+        :param interval: Seconds between checks when polling without inotify.
+        :return:
+        """
+
+        if self.follower is not None:
+            self.unfollow()
+
+        self.follower = Follower(self, path, cap=cap, interval=interval)
+        self.follower.previous_delay = self.stdscr.delay
+        # Wake up from waiting on keys to check the file.
+        if self.stdscr.delay < 0:
+            self.stdscr.timeout(int(interval * 1000))
+
+        self.path = path
+        self.read_only = True
+        self.lines = self.follower.lines
+        self.cursors.clear()
+        self.follower.poll()
+        self.refresh()
+        return self
+
+    def unfollow(self):
+        """
+        Stop following the file, keeping the lines that were read as an
+        editable document.
+
+        :return:
+        """
+
+        if self.follower is None:
+            return self
+
+        self.follower.close()
+        self.stdscr.timeout(self.follower.previous_delay)
+        lines = list(self.lines) or ['']
+        self.follower = None
+        self.read_only = False
+        self.lines = lines
+        x, y = self._clamp_to_screen(0, len(lines) - 1)
+        self._set_position(x, y)
+        self.refresh()
+        self.stdscr.move_cursor(x, y)
+        return self
+
+    def toggle_diff(self):
+        """
+        Start marking the lines that differ from the file they were loaded
+        from, or stop if they are already marked.
+
+        :return bool: Whether the diff is shown.
+        """
+
+        if self.diff_view is not None:
+            self.diff_view.close()
+            self.diff_view = None
+            self.refresh()
+            return False
+
+        if self.path is None:
+            raise ValueError('There is no file to diff against')
+        self.diff_view = DiffView(self, self.path)
+        self.diff_view.refresh()
+        return True
+
+    def completions(self, k=None):
+        """
+        Get completions from the words in the lines for the word before the
+        cursor. The index is built the first time and kept up to date as
+        the lines are edited after that.
+
+        :param int k: Number of completions.
+        :return tuple: The word before the cursor and its completions.
+        """
+
+        if self.completion_index is None or self.completion_index.lines is not self.lines:
+            if self.completion_index is not None:
+                self.completion_index.detach()
+            self.completion_index = CompletionIndex(self.lines)
+
+        match = COMPLETION_PREFIX.search(self.lines[self.line_no][:self.cursor.x])
+        if match is None:
+            return '', []
+        prefix = match.group()
+        return prefix, self.completion_index.complete(prefix, k)
+
+    def show_completions(self, k=None):
+        """
+        Open a popup with the completions for the word before the cursor.
+
+        :param int k: Number of completions.
+        :return bool: Whether there were any completions.
+        """
+
+        prefix, words = self.completions(k)
+        if not words:
+            return False
+        self.popup = CompletionPopup(self, prefix, words).draw()
+        return True
+
+    def memory_usage(self):
+        """
+        Get the bytes used by the lines, next to the bytes the same lines
+        would use as a list of str.
+
+        :return dict:
+        """
+
+        return line_memory(self.lines)
+
+    def _set_position(self, x, y):
+        """
+        Point `line_no`, `current_line` and the cursor at the given
+        x, y location in the lines.
+
+        :param x:
+        :param y:
+        :return:
+        """
+
+        self.line_no = y
+        self.current_line = self.lines[y]
+        self.cursor.x, self.cursor.y = x, y
+        return self
+
+    def insert_text(self, text, at=None):
+        """
+        Insert a block of text into the lines in a single operation.
+
+        The text is split into lines once and spliced into `lines`, then the
+        cursor, `line_no` and `current_line` are updated and the screen is
+        repainted a single time. The cursor is left at the end of the
+        inserted text and extra cursors after it move with their text.
+        Does nothing while the interface is read only.
+
+        :param str text:
+        :param at: x, y location to insert at. Defaults to the cursor.
+        :return:
+        """
+
+        if self.read_only:
+            return self
+
+        if at is None:
+            at = (self.cursor.x, self.line_no)
+        x, y = at[0], at[1]
+
+        new_lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        line = self.lines[y]
+        head, tail = line[:x], line[x:]
+
+        if len(new_lines) == 1:
+            end_x = x + len(new_lines[0])
+        else:
+            end_x = len(new_lines[-1])
+        end_y = y + len(new_lines) - 1
+
+        new_lines[0] = head + new_lines[0]
+        new_lines[-1] = new_lines[-1] + tail
+        self.lines[y:y + 1] = new_lines
+        self.cursors.replace_range((x, y), (x, y), (end_x, end_y))
+
+        self._set_position(end_x, end_y)
+        self.refresh()
+        return self.draw_cursors()
+
+    def delete_range(self, start, end):
+        """
+        Delete the text between two x, y locations in a single operation.
+
+        The locations may be given in either order. The cursor, `line_no`
+        and `current_line` are moved to the start of the deleted range and
+        the screen is repainted a single time. Extra cursors after the range
+        move with their text. Does nothing while the interface is read only.
+
+        :param start: x, y location.
+        :param end: x, y location.
+        :return:
+        """
+
+        if self.read_only:
+            return self
+
+        if (start[1], start[0]) > (end[1], end[0]):
+            start, end = end, start
+        start_x, start_y = start[0], start[1]
+        end_x, end_y = end[0], end[1]
+
+        joined = self.lines[start_y][:start_x] + self.lines[end_y][end_x:]
+        self.lines[start_y:end_y + 1] = [joined]
+        self.cursors.replace_range(start, end, start)
+
+        self._set_position(start_x, start_y)
+        self.refresh()
+        return self.draw_cursors()
+
+    def add_cursor(self, x, y):
+        """
+        Add an extra cursor at the given x, y location. Edits made with the
+        `*_at_cursors` methods are applied at every cursor.
+
+        :param x:
+        :param y:
+        :return:
+        """
+
+        if (y, x) != (self.line_no, self.cursor.x):
+            self.cursors.add(x, y)
+        return self.draw_cursors()
+
+    def clear_cursors(self):
+        """
+        Remove all of the extra cursors.
+
+        :return:
+        """
+
+        self.cursors.clear()
+        self.refresh()
+        self.stdscr.move_cursor(self.cursor.x, self.line_no)
+        return self
+
+    def draw_cursors(self):
+        """
+        Highlight the extra cursors that are on the screen and put the real
+        cursor back at the primary cursor.
+
+        :return:
+        """
+
+        height, width = self.stdscr.getmaxyx()
+        for y, x in self.cursors:
+            if y < height and x < width:
+                self.stdscr.chgat(y, x, 1, curses.A_REVERSE)
+        self.stdscr.move_cursor(self.cursor.x, self.line_no)
+        return self
+
+    def _edit_at_cursors(self, edit):
+        """
+        Apply an edit at the primary cursor and every extra cursor in one
+        sweep over the lines.
+
+        `edit(line, xs)` is called once for every line holding cursors, with
+        the sorted x locations of the cursors on it. It returns the pieces
+        the line is replaced with, the new (piece, x) location of each cursor
+        and whether the first piece joins onto the end of the line before.
+        Lines that are replaced one for one are set individually, anything
+        else is spliced into the lines in a single slice assignment.
+
+        :param edit:
+        :return:
+        """
+
+        # Edits made elsewhere can leave cursors past the end of the lines
+        # or of their line. Those past the last line are dropped and the
+        # rest are clamped before merging, so no two end up on one spot.
+        line_count = len(self.lines)
+        primary_y = min(self.line_no, line_count - 1)
+        primary = (primary_y, min(self.cursor.x, len(self.lines[primary_y])))
+        positions = {primary}
+        for y, x in self.cursors.positions:
+            if 0 <= y < line_count:
+                positions.add((y, min(x, len(self.lines[y]))))
+        positions = sorted(positions)
+
+        first, last = positions[0][0], positions[-1][0]
+        start = first - 1 if first > 0 else first
+        segment = self.lines[start:last + 1]
+
+        out = []
+        moved = {}
+        structural = False
+        i = 0
+        for y in range(start, last + 1):
+            line = segment[y - start]
+            xs = []
+            while i < len(positions) and positions[i][0] == y:
+                xs.append(positions[i][1])
+                i += 1
+            if not xs:
+                out.append(line)
+                continue
+
+            pieces, new_xs, join = edit(line, xs)
+            offset = 0
+            if join and out:
+                structural = True
+                offset = len(out[-1])
+                out[-1] += pieces[0]
+                base = len(out) - 1
+                out.extend(pieces[1:])
+            else:
+                structural = structural or len(pieces) != 1
+                base = len(out)
+                out.extend(pieces)
+
+            for old_x, (piece, x) in zip(xs, new_xs):
+                moved[(y, old_x)] = (start + base + piece, x + (offset if piece == 0 else 0))
+
+        if structural:
+            self.lines[start:last + 1] = out
+        else:
+            for y, line in enumerate(out, start):
+                if line is not segment[y - start]:
+                    self.lines[y] = line
+
+        primary_y, primary_x = moved[primary]
+        self.cursors.reset(position for position in moved.values() if position != (primary_y, primary_x))
+
+        self._set_position(primary_x, primary_y)
+        self.refresh()
+        return self.draw_cursors()
+
+    def insert_at_cursors(self, text):
+        """
+        Insert text without newlines at every cursor.
+
+        :param str text:
+        :return:
+        """
+
+        def edit(line, xs):
+            parts, new_xs, last = [], [], 0
+            for i, x in enumerate(xs):
+                parts.append(line[last:x])
+                parts.append(text)
+                new_xs.append((0, x + (i + 1) * len(text)))
+                last = x
+            parts.append(line[last:])
+            return [''.join(parts)], new_xs, False
+
+        return self._edit_at_cursors(edit)
+
+    def backspace_at_cursors(self):
+        """
+        Delete the character before every cursor. Cursors at the start of a
+        line join it onto the line before.
+
+        :return:
+        """
+
+        def edit(line, xs):
+            parts, new_xs, last = [], [], 0
+            for i, x in enumerate(xs):
+                deleted = i if xs[0] > 0 else i - 1
+                if x == 0:
+                    new_xs.append((0, 0))
+                    continue
+                parts.append(line[last:x - 1])
+                new_xs.append((0, x - 1 - deleted))
+                last = x
+            parts.append(line[last:])
+            return [''.join(parts)], new_xs, xs[0] == 0
+
+        return self._edit_at_cursors(edit)
+
+    def newline_at_cursors(self):
+        """
+        Split the line at every cursor.
+
+        :return:
+        """
+
+        def edit(line, xs):
+            pieces, new_xs, last = [], [], 0
+            for i, x in enumerate(xs):
+                pieces.append(line[last:x])
+                new_xs.append((i + 1, 0))
+                last = x
+            pieces.append(line[last:])
+            return pieces, new_xs, False
+
+        return self._edit_at_cursors(edit)
+
+    def pos_to_offset(self, x, y):
+        """
+        Get the absolute character offset of the given x, y location.
+        Newlines between lines count as a single character.
+
+        :param x:
+        :param y:
+        :return int:
+        """
+
+        return self.lines.line_index.prefix(y) + x
+
+    def offset_to_pos(self, offset):
+        """
+        Get the x, y location of the given absolute character offset. Offsets
+        outside of the lines are clamped to the start or end.
+
+        :param offset:
+        :return tuple:
+        """
+
+        line_index = self.lines.line_index
+        offset = max(0, min(offset, line_index.total()))
+        y = line_index.find(offset)
+        x = min(offset - line_index.prefix(y), len(self.lines[y]))
+        return x, y
+
+    def _clamp_to_screen(self, x, y):
+        """
+        Clamp an x, y location in the lines to the rows and columns on the
+        screen, since the lines are drawn from the first row without
+        scrolling.
+
+        :param x:
+        :param y:
+        :return tuple: x, y
+        """
+
+        height, width = self.stdscr.getmaxyx()
+        if y >= height:
+            x, y = 0, height - 1
+        return min(x, width - 1), y
+
+    def goto_offset(self, offset):
+        """
+        Move the cursor to the given absolute character offset. The lines
+        are drawn from the first row without scrolling, so a ValueError is
+        raised for locations below the last row of the screen.
+
+        :param offset:
+        :return:
+        """
+
+        x, y = self.offset_to_pos(offset)
+        height, width = self.stdscr.getmaxyx()
+        if y >= height:
+            raise ValueError('Line {} is below the screen'.format(y + 1))
+
+        x = min(x, width - 1)
+        self._set_position(x, y)
+        self.stdscr.move_cursor(x, y)
+        return self
+
+    def show_message(self, message):
+        """
+        Show a message on the bottom row of the screen, leaving the cursor
+        where it is.
+
+        :param message:
+        :return:
+        """
+
+        height, width = self.stdscr.getmaxyx()
+        self.stdscr.addstr(height - 1, 0, message[:width - 1])
+        self.stdscr.move_cursor(self.cursor.x, self.line_no)
+        return self
+
+    def goto_line(self, line_no):
+        """
+        Move the cursor to the start of the given line number. Raises a
+        ValueError when the line is below the screen.
+
+        :param line_no:
+        :return:
+        """
+
+        line_no = max(0, min(line_no, len(self.lines) - 1))
+        return self.goto_offset(self.pos_to_offset(0, line_no))
+
+    def prompt(self, message):
+        """
+        Ask for a line of input on the bottom row of the screen and
+        return it. The screen is repainted afterwards.
+
+        :param message:
+        :return str:
+        """
+
+        y = self.stdscr.getmaxyx()[0] - 1
+        self.stdscr.addstr(y, 0, message)
+        # Wait for the answer even when keys are read without delay.
+        delay = self.stdscr.delay
+        self.stdscr.timeout(-1)
+        self.curses.echo()
+        try:
+            answer = self.stdscr.getstr(y, len(message))
+        finally:
+            self.curses.noecho()
+            self.stdscr.timeout(delay)
+
+        self.refresh()
+        if isinstance(answer, bytes):
+            answer = answer.decode('utf-8', 'replace')
+        return answer
+
     def _run_callback(self, ch, unregistered=False):
         """
         Run a callback for the given ch.
@@ -73,6 +631,17 @@ class Interface(object):
             return self.callbacks[-1](self)
         return self.callbacks[ch](self)
 
+    def _edits(self, ch):
+        """
+        Check whether the callback for the given ch modifies the lines.
+
+        :param ch:
+        :return bool:
+        """
+
+        callback = self.callbacks.get(ch if ch in self.callbacks else -1)
+        return getattr(getattr(callback, '__self__', None), 'edits', False)
+
     def set_callback(self, ch, callback):
         """
         Register a callback for a specific key press.
@@ -92,82 +661,111 @@ class Interface(object):
         :return:
         """
 
-        callback_keys = list(self.callbacks.keys())
-        while True:
-            self.stdscr.refresh()
+        # Profile the whole session when asked to by the environment.
+        if os.environ.get(PROFILE_ENV) and self.profiler is not None:
+            self.profiler.start()
 
-            # Get the cursor and set the data as an
-            # attribute on the interface.
-            cursor_y, cursor_x = self.curses.getsyx()
-            self.cursor.y, self.cursor.x = cursor_y, cursor_x
+        try:
+            while True:
+                if self.follower is not None:
+                    self.follower.poll()
+                if self.diff_view is not None:
+                    self.diff_view.refresh()
 
-            # Get the ch and set it as an attribute
-            # on the interface.
-            ch = self.stdscr.getch()
-            self.ch = ch
-            if ch == curses.KEY_MOUSE:
-                mouse = self.curses.getmouse()
-                self.mouse.id = mouse[0]
-                self.mouse.x, self.mouse.y, self.mouse.z = mouse[1], mouse[2], mouse[3]
-                self.mouse.bstart = mouse[4]
-                y, x = self.stdscr.getyx()
-                # self.mouse = list(self.mouse) + [y, x]
+                self.stdscr.refresh()
 
-            # Run registered key callbacks.
-            if ch in callback_keys:
-                result = self._run_callback(ch)
-                if not result:
-                    break
-                continue
-            else:
-                self._run_callback(ch, unregistered=True)
+                # Get the cursor and set the data as an
+                # attribute on the interface.
+                cursor_y, cursor_x = self.curses.getsyx()
+                self.cursor.y, self.cursor.x = cursor_y, cursor_x
 
+                ch = self.stdscr.getch()
+                if not self.feed(ch):
+                    break
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop()
 
-if __name__ == '__main__':
-    def get_callback_dict(module_name, excludes=None, ch=False):
+    def feed(self, ch):
         """
-        Get a dict of callback methods on instantiated Callback's
+        Handle a single key press by running its callback. Returns False
+        when a registered callback asks for the interface to stop.
 
-        :param excludes:
         :param ch:
-        :return dict:
+        :return bool:
         """
 
-        if not excludes or excludes is None:
-            excludes = []
-
-        # Get list of exclusions.
-        exclusions = []
-        for exclude in excludes:
-            exclusions += dir(__import__(exclude))
-
-        # Import the given callbacks module.
-        all_callbacks = __import__(module_name)
-        # Get the import names.
-        callback_item_names = dir(all_callbacks)
-        # Filter out anything that was in the exclusions list.
-        callback_item_names = [item for item in callback_item_names if item not in exclusions]
-
-        # Create a callback dictionary for output.
-        callback_dict = {}
-        for callback_item_name in callback_item_names:
-            # If ch was set to True, then we should output a dict with
-            # the ch as the key and the callback method as the value.
-            # Then continue early.
-            if ch:
-                cbi = getattr(all_callbacks, callback_item_name)()
-                callback_dict[cbi.ch] = cbi.callback
-                continue
+        # Set the ch as an attribute on the interface.
+        self.ch = ch
+        if ch == curses.KEY_MOUSE:
+            mouse = self.curses.getmouse()
+            self.mouse.id = mouse[0]
+            self.mouse.x, self.mouse.y, self.mouse.z = mouse[1], mouse[2], mouse[3]
+            self.mouse.bstart = mouse[4]
+            y, x = self.stdscr.getyx()
+            # self.mouse = list(self.mouse) + [y, x]
 
-            # If ch is not set to true, this piece of code runes and
-            # gives a callback dictionary with the callback name
-            # as the key and the Callback object as the value.
-            # That means the `callback` method must still be accessed.
-            callback_dict[callback_item_name] = getattr(all_callbacks, callback_item_name)()
+        # An open popup gets the first look at the key.
+        if self.popup is not None and self.popup.key(ch):
+            return True
 
-        return callback_dict
+        # Keys that would change the lines do nothing while read only.
+        if self.read_only and self._edits(ch):
+            return True
 
+        # Run registered key callbacks.
+        if ch in self.callbacks:
+            return bool(self._run_callback(ch))
 
+        self._run_callback(ch, unregistered=True)
+        return True
+
+
+def get_callback_dict(module_name, excludes=None, ch=False):
+    """
+    Get a dict of callback methods on instantiated Callback's
+
+    :param excludes:
+    :param ch:
+    :return dict:
+    """
+
+    if not excludes or excludes is None:
+        excludes = []
+
+    # Get list of exclusions.
+    exclusions = []
+    for exclude in excludes:
+        exclusions += dir(__import__(exclude))
+
+    # Import the given callbacks module.
+    all_callbacks = __import__(module_name)
+    # Get the import names.
+    callback_item_names = dir(all_callbacks)
+    # Filter out anything that was in the exclusions list.
+    callback_item_names = [item for item in callback_item_names if item not in exclusions]
+
+    # Create a callback dictionary for output.
+    callback_dict = {}
+    for callback_item_name in callback_item_names:
+        # If ch was set to True, then we should output a dict with
+        # the ch as the key and the callback method as the value.
+        # Then continue early.
+        if ch:
+            cbi = getattr(all_callbacks, callback_item_name)()
+            callback_dict[cbi.ch] = cbi.callback
+            continue
+
+        # If ch is not set to true, this piece of code runes and
+        # gives a callback dictionary with the callback name
+        # as the key and the Callback object as the value.
+        # That means the `callback` method must still be accessed.
+        callback_dict[callback_item_name] = getattr(all_callbacks, callback_item_name)()
+
+    return callback_dict
+
+
+if __name__ == '__main__':
     def main():
         stdscr = curses.initscr()
         # curses.curs_set(0)
@@ -179,7 +777,6 @@ if __name__ == '__main__':
         pad = stdscr.subpad(0, 0)
         pad.scrollok(1)
         pad.idlok(1)
-        pad.nodelay(1)
 
         # Get a callback dictionary with the ch as the keys
         # and the `callback` method as the values
@@ -187,6 +784,7 @@ if __name__ == '__main__':
 
         # Instantiate the interface.
         interface = Interface(pad, callbacks=callback_dictionary)
+        interface.stdscr.nodelay(1)
         # A callback can be registered using the instance.
         # interface.set_callback(32, callback_dictionary[32])
 
@@ -0,0 +1,178 @@
+import cProfile
+import os
+import signal
+import time
+from collections import Counter
+
+
+# Environment variables that start profiling when the interface starts.
+PROFILE_ENV = 'CURSES_INTERFACE_PROFILE'
+PROFILE_DIR_ENV = 'CURSES_INTERFACE_PROFILE_DIR'
+
+MODES = ('cprofile', 'sample', 'both')
+
+_process_profiler = None
+
+
+class StackSampler(object):
+    """
+    Low-overhead profiler that samples the stack of the main thread on a
+    SIGPROF timer. Only CPU time is sampled, so time spent waiting for a
+    key press does not show up.
+    """
+
+    def __init__(self, interval=0.001):
+        """
+        :param interval: Seconds of CPU time between samples.
+        """
+
+        self.interval = interval
+        self.counts = Counter()
+        self.previous_handler = None
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append('{}:{}'.format(os.path.basename(code.co_filename), code.co_name))
+            frame = frame.f_back
+        self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self.previous_handler or signal.SIG_DFL)
+        return self
+
+    def dump(self, path):
+        """
+        Write the samples in the collapsed stack format used by flamegraph
+        tools, one `frame;frame;frame count` line per stack.
+
+        :param path:
+        :return:
+        """
+
+        with open(path, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write('{} {}\n'.format(stack, count))
+        return self
+
+
+class Profiler(object):
+    """
+    Profile the key loop and callbacks of an Interface.
+
+    The `cprofile` mode writes a pstats file, the `sample` mode writes a
+    collapsed stack file and `both` writes both. Files are written to
+    `directory` when the profiler is stopped.
+    """
+
+    def __init__(self, mode='cprofile', directory=None, interval=0.001):
+        """
+        :param mode: One of `cprofile`, `sample` or `both`.
+        :param directory: Where to write the results. Defaults to the cwd.
+        :param interval: Seconds of CPU time between stack samples.
+        """
+
+        if mode not in MODES:
+            raise ValueError('The mode should be one of {}, but got {!r}'.format(', '.join(MODES), mode))
+
+        self.mode = mode
+        self.directory = directory or os.getcwd()
+        self.interval = interval
+        self.profile = None
+        self.sampler = None
+        self.running = False
+        # Numbers the result files so that runs in the same second don't
+        # overwrite each other.
+        self.runs = 0
+
+    @classmethod
+    def from_environment(cls):
+        """
+        Create a profiler from the environment. Returns None unless the
+        profile environment variable is set.
+
+        :return Profiler:
+        """
+
+        mode = os.environ.get(PROFILE_ENV)
+        if not mode:
+            return None
+        if mode not in MODES:
+            mode = 'cprofile'
+        return cls(mode, os.environ.get(PROFILE_DIR_ENV))
+
+    def start(self):
+        if self.running:
+            return self
+
+        if self.mode in ('cprofile', 'both'):
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        if self.mode in ('sample', 'both'):
+            self.sampler = StackSampler(self.interval).start()
+
+        self.running = True
+        return self
+
+    def stop(self):
+        """
+        Stop profiling and write the results.
+
+        :return list: Paths of the files that were written.
+        """
+
+        if not self.running:
+            return []
+        self.running = False
+
+        self.runs += 1
+        name = 'interface-{}-{}-{}'.format(os.getpid(), time.strftime('%Y%m%d-%H%M%S'), self.runs)
+        prefix = os.path.join(self.directory, name)
+        paths = []
+
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(prefix + '.pstats')
+            paths.append(prefix + '.pstats')
+            self.profile = None
+
+        if self.sampler is not None:
+            self.sampler.stop().dump(prefix + '.folded')
+            paths.append(prefix + '.folded')
+            self.sampler = None
+
+        return paths
+
+    def toggle(self):
+        """
+        Start profiling if it is stopped, otherwise stop it.
+
+        :return list: Paths of the files written when stopping.
+        """
+
+        if self.running:
+            return self.stop()
+        self.start()
+        return []
+
+
+def process_profiler():
+    """
+    Get the profiler shared by every Interface in the process. cProfile and
+    the SIGPROF timer are process wide, so there can only be one running.
+    It is set up from the environment the first time.
+
+    :return Profiler:
+    """
+
+    global _process_profiler
+    if _process_profiler is None:
+        _process_profiler = Profiler.from_environment() or Profiler()
+    return _process_profiler
@@ -0,0 +1,746 @@
+import argparse
+import asyncio
+import codecs
+import curses
+import logging
+import os
+import sys
+import tempfile
+import time
+import tty
+from collections import deque
+
+from interface import Interface, get_callback_dict
+
+logger = logging.getLogger(__name__)
+
+
+# Escape sequences sent by terminals mapped to curses key codes.
+ESCAPE_KEYS = {
+    '[A': curses.KEY_UP,
+    '[B': curses.KEY_DOWN,
+    '[C': curses.KEY_RIGHT,
+    '[D': curses.KEY_LEFT,
+    'OA': curses.KEY_UP,
+    'OB': curses.KEY_DOWN,
+    'OC': curses.KEY_RIGHT,
+    'OD': curses.KEY_LEFT,
+}
+
+# Seconds to wait for the rest of an escape sequence before a lone Escape
+# is taken as the Escape key.
+ESCAPE_DELAY = 0.05
+
+# Attributes that can be rendered with SGR escape sequences.
+ATTRIBUTE_CODES = (
+    (curses.A_BOLD, '1'),
+    (curses.A_UNDERLINE, '4'),
+    (curses.A_REVERSE, '7'),
+)
+
+
+class KeyDecoder(object):
+    """
+    Turn the bytes sent by a terminal into the key codes `getch` would return.
+
+    Escape sequences split across reads are kept until the rest arrives, or
+    until `flush` gives up on them.
+    """
+
+    def __init__(self):
+        self.pending = ''
+        self.decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+    def feed(self, data):
+        """
+        Decode a chunk of input and return the complete keys in it.
+
+        :param bytes data:
+        :return list:
+        """
+
+        text = self.pending + self.decoder.decode(data)
+        self.pending = ''
+
+        keys = []
+        i = 0
+        while i < len(text):
+            ch = text[i]
+            if ch == '\x1b':
+                sequence = text[i + 1:i + 3]
+                if not sequence or len(sequence) < 2 and sequence[0] in '[O':
+                    self.pending = text[i:]
+                    break
+                if sequence in ESCAPE_KEYS:
+                    keys.append(ESCAPE_KEYS[sequence])
+                    i += 3
+                    continue
+                keys.append(27)
+            elif ch == '\r':
+                keys.append(10)
+            elif ch == '\x08':
+                keys.append(127)
+            else:
+                keys.append(ord(ch))
+            i += 1
+
+        return keys
+
+    def flush(self):
+        """
+        Give up waiting for the rest of an escape sequence and return the
+        keys held back as they are.
+
+        :return list:
+        """
+
+        text, self.pending = self.pending, ''
+        return [27] + [ord(ch) for ch in text[1:]] if text else []
+
+
+class Terminal(object):
+    """
+    Pure-Python stand-in for a curses screen that renders to a byte stream.
+
+    The terminal keeps a grid of cells that its windows draw into. Calling
+    `doupdate` compares the grid against what was last sent and writes the
+    changed rows as ANSI escape sequences to `write`. The object also provides
+    the curses module functions the Interface uses, so it can be passed as
+    the `curses_module` of an Interface.
+    """
+
+    KEY_MOUSE = curses.KEY_MOUSE
+    error = curses.error
+
+    def __init__(self, write, lines=24, cols=80):
+        """
+        :param write: Callable that receives the rendered bytes.
+        :param lines:
+        :param cols:
+        """
+
+        self.write = write
+        self.lines = lines
+        self.cols = cols
+        self.chars = [[' '] * cols for _ in range(lines)]
+        self.attrs = [[0] * cols for _ in range(lines)]
+        self.sent = [None] * lines
+        self.sent_cursor = None
+        self.stdscr = TerminalWindow(self, lines, cols, 0, 0)
+        self.bytes_written = 0
+
+    def cbreak(self):
+        pass
+
+    def nocbreak(self):
+        pass
+
+    def echo(self):
+        pass
+
+    def noecho(self):
+        pass
+
+    def endwin(self):
+        pass
+
+    def getmouse(self):
+        raise curses.error('getmouse() is not supported on a Terminal')
+
+    def getsyx(self):
+        return self.stdscr.getyx()
+
+    def _render_row(self, y):
+        out = []
+        current = 0
+        chars, attrs = self.chars[y], self.attrs[y]
+        for x in range(self.cols):
+            if attrs[x] != current:
+                current = attrs[x]
+                codes = [code for attr, code in ATTRIBUTE_CODES if current & attr]
+                out.append('\x1b[0{}m'.format(''.join(';' + code for code in codes)))
+            out.append(chars[x])
+        if current:
+            out.append('\x1b[0m')
+        return ''.join(out)
+
+    def doupdate(self):
+        """
+        Write the rows that changed since the last update, then the cursor.
+
+        :return:
+        """
+
+        out = []
+        for y in range(self.lines):
+            row = (tuple(self.chars[y]), tuple(self.attrs[y]))
+            if row == self.sent[y]:
+                continue
+            self.sent[y] = row
+            out.append('\x1b[{};1H'.format(y + 1))
+            out.append(self._render_row(y))
+
+        cursor = self.stdscr.getyx()
+        if out or cursor != self.sent_cursor:
+            self.sent_cursor = cursor
+            out.append('\x1b[{};{}H'.format(cursor[0] + 1, cursor[1] + 1))
+            data = ''.join(out).encode('utf-8')
+            self.bytes_written += len(data)
+            self.write(data)
+
+    def memory(self):
+        """
+        Approximate number of bytes used by the terminal's grids.
+
+        :return int:
+        """
+
+        size = 0
+        for grid in (self.chars, self.attrs, self.sent):
+            size += sys.getsizeof(grid)
+            for row in grid:
+                size += sys.getsizeof(row)
+        return size
+
+
+class TerminalWindow(object):
+    """
+    Window drawing into a region of a Terminal's grid. Supports the subset of
+    the curses window API used by the Interface and its callbacks.
+    """
+
+    def __init__(self, terminal, nlines, ncols, begin_y, begin_x):
+        self.terminal = terminal
+        self.nlines = nlines
+        self.ncols = ncols
+        self.begin_y = begin_y
+        self.begin_x = begin_x
+        self.y = 0
+        self.x = 0
+        self.scrolling = False
+
+    def getyx(self):
+        return self.y, self.x
+
+    def getmaxyx(self):
+        return self.nlines, self.ncols
+
+    def move(self, y, x):
+        if not (0 <= y < self.nlines and 0 <= x < self.ncols):
+            raise curses.error('move() returned ERR')
+        self.y, self.x = y, x
+
+    def _put(self, ch, attr):
+        y, x = self.begin_y + self.y, self.begin_x + self.x
+        if 0 <= y < self.terminal.lines and 0 <= x < self.terminal.cols:
+            self.terminal.chars[y][x] = ch
+            self.terminal.attrs[y][x] = attr
+
+    def _newline(self):
+        self.x = 0
+        if self.y + 1 < self.nlines:
+            self.y += 1
+            return True
+        if self.scrolling:
+            self.scroll()
+            return True
+        return False
+
+    def addstr(self, *args):
+        """
+        Write a string at the cursor or at the given y, x. Text that runs
+        past the bottom of a window without scrolling is dropped.
+
+        :param args:
+        :return:
+        """
+
+        if isinstance(args[0], int):
+            self.move(args[0], args[1])
+            args = args[2:]
+        text = args[0]
+        attr = args[1] if len(args) > 1 else 0
+
+        for ch in text:
+            if ch == '\n':
+                self.clrtoeol()
+                if not self._newline():
+                    return
+            elif ch == '\r':
+                self.x = 0
+            else:
+                self._put(ch, attr)
+                self.x += 1
+                if self.x >= self.ncols and not self._newline():
+                    self.x = self.ncols - 1
+                    return
+
+    def chgat(self, *args):
+        if len(args) > 2:
+            self.move(args[0], args[1])
+            args = args[2:]
+        num, attr = (args[0], args[1]) if len(args) > 1 else (-1, args[0])
+        end = self.ncols if num < 0 else min(self.ncols, self.x + num)
+        y = self.begin_y + self.y
+        if 0 <= y < self.terminal.lines:
+            for x in range(self.begin_x + self.x, min(self.begin_x + end, self.terminal.cols)):
+                self.terminal.attrs[y][x] = attr
+
+    def clrtoeol(self):
+        y = self.begin_y + self.y
+        if 0 <= y < self.terminal.lines:
+            for x in range(self.begin_x + self.x, min(self.begin_x + self.ncols, self.terminal.cols)):
+                self.terminal.chars[y][x] = ' '
+                self.terminal.attrs[y][x] = 0
+
+    def erase(self):
+        for y in range(self.nlines):
+            self.y, self.x = y, 0
+            self.clrtoeol()
+        self.y, self.x = 0, 0
+
+    def clear(self):
+        self.erase()
+
+    def scroll(self, lines=1):
+        terminal = self.terminal
+        top, bottom = self.begin_y, min(self.begin_y + self.nlines, terminal.lines)
+        left, right = self.begin_x, min(self.begin_x + self.ncols, terminal.cols)
+        for grid, blank in ((terminal.chars, ' '), (terminal.attrs, 0)):
+            rows = [grid[y][left:right] for y in range(top, bottom)]
+            rows = rows[lines:] + [[blank] * (right - left) for _ in range(min(lines, len(rows)))]
+            for y, row in zip(range(top, bottom), rows):
+                grid[y][left:right] = row
+
+    def scrollok(self, flag):
+        self.scrolling = bool(flag)
+
+    def subpad(self, *args):
+        """
+        Create a window sharing this window's cells. Takes the same
+        `[nlines, ncols,] begin_y, begin_x` arguments as curses.
+
+        :param args:
+        :return TerminalWindow:
+        """
+
+        nlines, ncols = (args[0], args[1]) if len(args) > 2 else (0, 0)
+        begin_y, begin_x = args[-2], args[-1]
+        nlines = nlines or self.nlines - begin_y
+        ncols = ncols or self.ncols - begin_x
+        return TerminalWindow(self.terminal, nlines, ncols, self.begin_y + begin_y, self.begin_x + begin_x)
+
+    def keypad(self, flag):
+        pass
+
+    def idlok(self, flag):
+        pass
+
+    def nodelay(self, flag):
+        pass
+
+    def timeout(self, delay):
+        pass
+
+    def noutrefresh(self):
+        pass
+
+    def refresh(self):
+        self.terminal.doupdate()
+
+    def getch(self, *args):
+        return -1
+
+    def getstr(self, *args):
+        return b''
+
+
+class Session(object):
+    """
+    A single Interface attached to a client, with latency accounting.
+    """
+
+    def __init__(self, session_id, write, callbacks, lines=24, cols=80):
+        self.id = session_id
+        self.terminal = Terminal(write, lines, cols)
+        self.terminal.stdscr.scrollok(True)
+        self.interface = Interface(self.terminal.stdscr, callbacks=callbacks, curses_module=self.terminal)
+        # The debug info is drawn from column 80, so there is only room
+        # for it on wider terminals.
+        if cols <= 80:
+            self.interface.debug_pad = None
+        # Profiling covers the whole process, so clients can't start it.
+        self.interface.profiler = None
+        self.decoder = KeyDecoder()
+        self.latencies = deque(maxlen=1000)
+        self.keys = 0
+        self.errors = 0
+        self.frame_handle = None
+        self.escape_handle = None
+        # Called when the interface asks to stop outside of `handle`.
+        self.on_stop = None
+        self.interface.refresh()
+        self.interface.stdscr.flush(force=True)
+
+    def handle(self, data, loop=None):
+        """
+        Run the callbacks for the keys in a chunk of input and draw the
+        result. Returns False once the interface asks to stop.
+
+        A lone Escape at the end of the chunk may be the start of a key
+        whose rest is still on the way, so it is held back until the next
+        chunk or for `ESCAPE_DELAY` seconds on the loop.
+
+        :param bytes data:
+        :param loop:
+        :return bool:
+        """
+
+        start = time.perf_counter()
+        if self.escape_handle is not None:
+            self.escape_handle.cancel()
+            self.escape_handle = None
+
+        alive = self._feed(self.decoder.feed(data))
+        if alive and self.decoder.pending and loop is not None:
+            self.escape_handle = loop.call_later(ESCAPE_DELAY, self._flush_keys, loop)
+
+        self.draw(loop)
+        self.latencies.append(time.perf_counter() - start)
+        return alive
+
+    def _feed(self, keys):
+        interface = self.interface
+        for ch in keys:
+            cursor_y, cursor_x = self.terminal.getsyx()
+            interface.cursor.y, interface.cursor.x = cursor_y, cursor_x
+            self.keys += 1
+            if not interface.feed(ch):
+                return False
+
+            # A write outside of the terminal is logged and skipped, the
+            # rest of the key's drawing still goes out.
+            errors = []
+            interface.stdscr.apply(errors)
+            for name, args, error in errors:
+                self.errors += 1
+                logger.warning('Session %s: %s%r for key %r failed: %s', self.id, name, args, ch, error)
+
+        return True
+
+    def _flush_keys(self, loop):
+        self.escape_handle = None
+        alive = self._feed(self.decoder.flush())
+        self.draw(loop)
+        if not alive and self.on_stop is not None:
+            self.on_stop()
+
+    def draw(self, loop=None):
+        """
+        Flush the interface's screen. When the frame is held back by the
+        frame rate cap, schedule it on the loop.
+
+        :param loop:
+        :return:
+        """
+
+        screen = self.interface.stdscr
+        screen.flush()
+        if screen.pending and loop is not None and self.frame_handle is None:
+            wait = max(screen.last_update + 1.0 / screen.frame_rate - time.time(), 0)
+            self.frame_handle = loop.call_later(wait, self._draw_frame)
+
+    def _draw_frame(self):
+        self.frame_handle = None
+        self.interface.stdscr.flush(force=True)
+
+    def close(self):
+        if self.frame_handle is not None:
+            self.frame_handle.cancel()
+            self.frame_handle = None
+        if self.escape_handle is not None:
+            self.escape_handle.cancel()
+            self.escape_handle = None
+
+    def memory(self):
+        """
+        Approximate number of bytes used by the session's lines and screen.
+
+        :return int:
+        """
+
+        lines = self.interface.lines
+        size = sys.getsizeof(lines) + sum(sys.getsizeof(line) for line in lines)
+        return size + self.terminal.memory()
+
+    def stats(self):
+        """
+        Get the latency and memory numbers for the session.
+
+        :return dict:
+        """
+
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            'id': self.id,
+            'keys': self.keys,
+            'bytes_out': self.terminal.bytes_written,
+            'errors': self.errors,
+            'memory': self.memory(),
+            'latency_mean_ms': sum(latencies) / count * 1000 if count else 0.0,
+            'latency_p99_ms': latencies[min(count - 1, int(count * 0.99))] * 1000 if count else 0.0,
+            'latency_max_ms': latencies[-1] * 1000 if count else 0.0,
+        }
+
+
+class Server(object):
+    """
+    Host many Interface sessions in one process on a single asyncio loop.
+
+    Clients connect over a Unix-domain socket, or attach to a PTY created
+    with `open_pty`. Every client gets its own Interface and Terminal.
+    """
+
+    def __init__(self, callbacks_module='text_editor_callbacks', lines=24, cols=80):
+        self.callbacks_module = callbacks_module
+        self.lines = lines
+        self.cols = cols
+        self.sessions = {}
+        self.clients = {}
+        self.next_id = 0
+        self.server = None
+
+    def _new_session(self, write):
+        callbacks = get_callback_dict(self.callbacks_module, excludes=['common'], ch=True)
+        session = Session(self.next_id, write, callbacks, self.lines, self.cols)
+        self.sessions[session.id] = session
+        self.next_id += 1
+        return session
+
+    def _end_session(self, session):
+        session.close()
+        self.sessions.pop(session.id, None)
+
+    async def _client(self, reader, writer):
+        session = self._new_session(writer.write)
+        # Closing the writer ends the read below.
+        session.on_stop = writer.close
+        self.clients[session.id] = (asyncio.current_task(), writer)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data or not session.handle(data, loop):
+                    break
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._end_session(session)
+            self.clients.pop(session.id, None)
+            writer.close()
+
+    async def start(self, path, backlog=1024):
+        """
+        Start accepting clients on the Unix-domain socket at `path`.
+
+        :param path:
+        :param backlog: Connections that may wait to be accepted.
+        :return:
+        """
+
+        self.server = await asyncio.start_unix_server(self._client, path=path, backlog=backlog)
+        return self
+
+    def open_pty(self):
+        """
+        Start a session on a new PTY and return the path of its slave side,
+        which a terminal can attach to.
+
+        :return str:
+        """
+
+        loop = asyncio.get_running_loop()
+        master, slave = os.openpty()
+        # Without raw mode the PTY would echo the output back as input.
+        tty.setraw(slave)
+        os.set_blocking(master, False)
+
+        # Output the PTY can't take yet, written once it is writable again.
+        unwritten = bytearray()
+
+        def flush():
+            try:
+                written = os.write(master, unwritten)
+            except BlockingIOError:
+                return
+            except OSError:
+                written = len(unwritten)
+            del unwritten[:written]
+            if not unwritten:
+                loop.remove_writer(master)
+
+        def write(data):
+            if unwritten:
+                unwritten.extend(data)
+                return
+            try:
+                written = os.write(master, data)
+            except BlockingIOError:
+                written = 0
+            if written < len(data):
+                unwritten.extend(data[written:])
+                loop.add_writer(master, flush)
+
+        session = self._new_session(write)
+
+        def close():
+            loop.remove_reader(master)
+            loop.remove_writer(master)
+            self._end_session(session)
+            os.close(master)
+            os.close(slave)
+
+        def read():
+            try:
+                data = os.read(master, 4096)
+            except OSError:
+                data = b''
+            if not data or not session.handle(data, loop):
+                close()
+
+        session.on_stop = close
+        loop.add_reader(master, read)
+        return os.ttyname(slave)
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+
+        # Hang up on the clients and let their handlers finish.
+        clients = list(self.clients.values())
+        for task, writer in clients:
+            writer.close()
+        await asyncio.gather(*[task for task, writer in clients], return_exceptions=True)
+
+        for session in list(self.sessions.values()):
+            self._end_session(session)
+        if self.server is not None:
+            await self.server.wait_closed()
+
+    def report(self):
+        """
+        Get the stats of every session.
+
+        :return list:
+        """
+
+        return [session.stats() for session in self.sessions.values()]
+
+
+def summarize(stats):
+    """
+    Combine per-session stats into a single summary.
+
+    :param stats:
+    :return dict:
+    """
+
+    if not stats:
+        return {'sessions': 0}
+    return {
+        'sessions': len(stats),
+        'keys': sum(s['keys'] for s in stats),
+        'bytes_out': sum(s['bytes_out'] for s in stats),
+        'errors': sum(s['errors'] for s in stats),
+        'memory_mean': sum(s['memory'] for s in stats) // len(stats),
+        'latency_mean_ms': sum(s['latency_mean_ms'] for s in stats) / len(stats),
+        'latency_p99_ms': max(s['latency_p99_ms'] for s in stats),
+        'latency_max_ms': max(s['latency_max_ms'] for s in stats),
+    }
+
+
+async def load_test(clients=200, keystrokes=200, interval=0.005, path=None):
+    """
+    Drive a number of simulated clients against a local server and return
+    the summary of the session stats.
+
+    :param clients:
+    :param keystrokes: Number of keys each client types.
+    :param interval: Seconds between key presses.
+    :param path: Socket path. Defaults to a temporary one.
+    :return dict:
+    """
+
+    directory = None
+    if path is None:
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'interface.sock')
+
+    server = await Server().start(path)
+    script = ('the quick brown fox jumps over the lazy dog\r' * (keystrokes // 44 + 1))[:keystrokes]
+
+    async def client():
+        reader, writer = await asyncio.open_unix_connection(path)
+        for ch in script:
+            writer.write(ch.encode('utf-8'))
+            await writer.drain()
+            await asyncio.sleep(interval)
+        # Read whatever output is left, then hang up.
+        try:
+            while await asyncio.wait_for(reader.read(65536), 0.1):
+                pass
+        except asyncio.TimeoutError:
+            pass
+        return writer
+
+    started = time.perf_counter()
+    writers = await asyncio.gather(*[client() for _ in range(clients)])
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(server.report())
+    summary['elapsed_s'] = elapsed
+
+    for writer in writers:
+        writer.close()
+    await server.close()
+    if directory is not None:
+        os.unlink(path)
+        os.rmdir(directory)
+    return summary
+
+
+if __name__ == '__main__':
+    def main():
+        parser = argparse.ArgumentParser(description='Serve many interfaces from one process.')
+        parser.add_argument('path', nargs='?', default='interface.sock', help='Unix-domain socket to listen on.')
+        parser.add_argument('--pty', type=int, default=0, help='Number of PTY sessions to open.')
+        parser.add_argument('--load-test', type=int, metavar='CLIENTS', help='Run a local load test instead.')
+        parser.add_argument('--keystrokes', type=int, default=200)
+        args = parser.parse_args()
+
+        if args.load_test:
+            summary = asyncio.run(load_test(args.load_test, args.keystrokes))
+            for key, value in summary.items():
+                print('{:<16} {}'.format(key, value))
+            return
+
+        async def serve():
+            server = await Server().start(args.path)
+            for _ in range(args.pty):
+                print('PTY session: {}'.format(server.open_pty()))
+            print('Listening on {}'.format(args.path))
+            try:
+                while True:
+                    await asyncio.sleep(10)
+                    print(summarize(server.report()))
+            finally:
+                await server.close()
+
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import curses
+
+import pytest
+
+
+class FakeWindow(object):
+    """
+    Stand-in for a curses window that records what is drawn.
+    """
+
+    def __init__(self, lines=24, cols=80):
+        self.lines, self.cols = lines, cols
+        self.y = self.x = 0
+        self.delay = -1
+        self.delays = []
+        self.keys = []
+
+    def subpad(self, *args):
+        return FakeWindow(self.lines, self.cols)
+
+    def getmaxyx(self):
+        return self.lines, self.cols
+
+    def getyx(self):
+        return self.y, self.x
+
+    def move(self, y, x):
+        if not (0 <= y < self.lines and 0 <= x < self.cols):
+            raise curses.error('move() returned ERR')
+        self.y, self.x = y, x
+
+    def addstr(self, *args):
+        if isinstance(args[0], int):
+            self.move(args[0], args[1])
+
+    def chgat(self, *args):
+        if not (0 <= args[0] < self.lines and 0 <= args[1] < self.cols):
+            raise curses.error('chgat() returned ERR')
+
+    def timeout(self, delay):
+        self.delay = delay
+        self.delays.append(delay)
+
+    def nodelay(self, flag):
+        self.timeout(0 if flag else -1)
+
+    def getch(self, *args):
+        return self.keys.pop(0) if self.keys else -1
+
+    def getstr(self, *args):
+        return b'' if self.delay >= 0 else b'12'
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeCurses(object):
+    """
+    Stand-in for the curses module, falling back to its constants.
+    """
+
+    def getsyx(self):
+        return 0, 0
+
+    def __getattr__(self, name):
+        if name.isupper() or name == 'error':
+            return getattr(curses, name)
+        return lambda *args, **kwargs: None
+
+
+@pytest.fixture
+def interface():
+    from interface import Interface, get_callback_dict
+    callbacks = get_callback_dict('text_editor_callbacks', excludes=['common'], ch=True)
+    return Interface(FakeWindow(), callbacks=callbacks, curses_module=FakeCurses())
+
+
+@pytest.fixture
+def session(request):
+    """
+    Server session with the text editor callbacks. Parametrize it
+    indirectly with a column count for other widths.
+    """
+
+    from interface import get_callback_dict
+    from server import Session
+    callbacks = get_callback_dict('text_editor_callbacks', excludes=['common'], ch=True)
+    return Session(1, lambda data: None, callbacks, cols=getattr(request, 'param', 80))
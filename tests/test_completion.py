@@ -0,0 +1,69 @@
+import random
+from collections import Counter
+
+from common import Lines
+from completion import CompletionIndex
+
+
+def test_most_frequent_first():
+    index = CompletionIndex(Lines(['foobar foobaz', 'foobaz fooqux foobaz', 'other']))
+    assert index.complete('foo') == ['foobaz', 'foobar', 'fooqux']
+    assert index.complete('foo', 1) == ['foobaz']
+    assert index.complete('foobaz') == []
+    assert index.complete('nope') == []
+
+
+def test_edits_update_the_counts():
+    lines = Lines(['alpha alpha', 'beta'])
+    index = CompletionIndex(lines)
+    assert index.complete('al') == ['alpha']
+    lines[0] = 'alps'
+    assert index.complete('al') == ['alps']
+    lines.insert(0, 'alpha alpha alpha')
+    assert index.complete('al') == ['alpha', 'alps']
+    del lines[0]
+    assert index.complete('al') == ['alps']
+    assert 'alpha' not in index.counts
+
+
+def test_random_edits_match_a_fresh_index():
+    random.seed(36)
+    words = ['abc', 'abd', 'abcd', 'bcd', 'xyz', 'xyzw']
+    lines = Lines([''])
+    index = CompletionIndex(lines)
+    for _ in range(300):
+        i = random.randrange(len(lines))
+        text = ' '.join(random.choice(words) for _ in range(random.randrange(4)))
+        op = random.randrange(3)
+        if op == 0:
+            lines[i] = text
+        elif op == 1:
+            lines.insert(i, text)
+        elif len(lines) > 1:
+            del lines[i]
+        index.complete('ab')
+    fresh = CompletionIndex(Lines(list(lines)))
+    assert index.counts == fresh.counts
+    assert index.counts == Counter(index._words(lines))
+    for prefix in ('a', 'ab', 'abc', 'x', 'b'):
+        assert index.complete(prefix) == fresh.complete(prefix)
+
+
+def test_rare_words_are_evicted():
+    lines = Lines(['common common common'] + ['rare{}'.format(i) for i in range(100)])
+    index = CompletionIndex(lines, max_words=50)
+    assert len(index) <= 50
+    assert index.counts['common'] == 3
+    lines.append('common')
+    assert index.counts['common'] == 4
+
+
+def test_popup_stays_open_without_keys(interface):
+    interface.load_text('foobar foobaz\nfoo')
+    interface._set_position(3, 1)
+    interface.feed(0)
+    interface.feed(-1)
+    assert interface.popup is not None
+    interface.feed(ord('2'))
+    assert interface.popup is None
+    assert list(interface.lines) == ['foobar foobaz', 'foobaz']
@@ -0,0 +1,37 @@
+def test_insert_at_every_cursor(interface):
+    interface.load_text('abc\nabc\nabc')
+    interface.add_cursor(1, 1)
+    interface.add_cursor(1, 2)
+    interface._set_position(1, 0)
+    interface.insert_at_cursors('X')
+    assert list(interface.lines) == ['aXbc'] * 3
+
+
+def test_cursors_past_the_last_line_are_dropped(interface):
+    interface.load_text('one\ntwo')
+    interface.cursors.add(0, 5)
+    interface._set_position(3, 1)
+    interface.insert_at_cursors('!')
+    assert list(interface.lines) == ['one', 'two!']
+    assert interface.cursors.positions == []
+
+
+def test_cursors_clamped_to_one_spot_insert_once(interface):
+    interface.load_text('ab\ncd')
+    interface.cursors.add(7, 0)
+    interface.cursors.add(9, 0)
+    interface._set_position(0, 1)
+    interface.insert_at_cursors('Z')
+    assert list(interface.lines) == ['abZ', 'Zcd']
+    assert interface.cursors.positions == [(0, 3)]
+
+
+def test_cursors_below_the_screen_are_not_highlighted(interface):
+    interface.load_text('\n'.join('line{}'.format(i) for i in range(30)))
+    interface._set_position(0, 22)
+    for i in range(3):
+        interface.feed(14)
+    errors = []
+    interface.stdscr.apply(errors)
+    assert errors == []
+    assert interface.cursors.positions == [(23, 0), (24, 0), (25, 0)]
@@ -0,0 +1,118 @@
+import random
+
+from common import Lines
+from diff import DiffView, LineHasher, LineHashes, diff, rediff
+
+
+def patch(a, b, hunks):
+    """
+    Rebuild `b` from `a` and the hunks, checking they are in order.
+    """
+
+    out, i, j = [], 0, 0
+    for a0, a1, b0, b1 in hunks:
+        assert a0 >= i and b0 >= j
+        assert a[i:a0] == b[j:b0]
+        out += a[i:a0] + b[b0:b1]
+        i, j = a1, b1
+    return out + a[i:]
+
+
+def test_simple_diffs():
+    assert diff([1, 2, 3], [1, 2, 3]) == []
+    assert diff([1, 2, 3], [1, 4, 3]) == [(1, 2, 1, 2)]
+    assert diff([1, 2, 3], [1, 2, 5, 3]) == [(2, 2, 2, 3)]
+    assert diff([1, 2, 3], [1, 3]) == [(1, 2, 1, 1)]
+    assert diff([], [1]) == [(0, 0, 0, 1)]
+
+
+def test_random_diffs_patch_back():
+    random.seed(35)
+    for _ in range(500):
+        a = [random.randrange(6) for _ in range(random.randrange(30))]
+        b = [random.randrange(6) for _ in range(random.randrange(30))]
+        assert patch(a, b, diff(a, b)) == b
+
+
+def test_long_diff_finds_each_change():
+    a = list(range(100000))
+    b = list(a)
+    for i in range(0, 100000, 10000):
+        b[i] = -i - 1
+    del b[55555]
+    hunks = diff(a, b)
+    assert patch(a, b, hunks) == b
+    assert len(hunks) == 11
+
+
+def test_rediff_matches_a_patch_after_random_edits():
+    random.seed(36)
+    for _ in range(300):
+        hasher = LineHasher()
+        base = [str(random.randrange(8)) for _ in range(random.randrange(1, 40))]
+        a = hasher.many(base)
+        lines = Lines(base)
+        hashes = LineHashes(lines, hasher)
+        hunks = diff(a, hashes.ids)
+        for _ in range(5):
+            for _ in range(random.randrange(1, 4)):
+                i = random.randrange(len(lines))
+                op = random.randrange(3)
+                if op == 0:
+                    lines[i] = str(random.randrange(10))
+                elif op == 1:
+                    lines.insert(i, str(random.randrange(10)))
+                elif len(lines) > 1:
+                    lines[i:i + 2] = [str(random.randrange(10)) for _ in range(random.randrange(3))] or ['']
+            if hashes.dirty:
+                hunks = rediff(a, hashes.ids, hunks, hashes.changed)
+                hashes.changed = None
+            assert hashes.ids == hasher.many(lines)
+            assert patch(a, hashes.ids, hunks) == hashes.ids
+
+
+def test_diff_view_prunes_old_lines(interface, tmpdir):
+    path = tmpdir.join('file.txt')
+    path.write('one\ntwo\nthree')
+    interface.open(str(path))
+    view = DiffView(interface, str(path))
+    assert view.update() == []
+
+    for i in range(50):
+        interface.lines[1] = 'two {}'.format(i)
+        view.update()
+    assert view.hunks == [(1, 2, 1, 2)]
+
+    path.write('one\ntwo 49\nthree\nfour')
+    view.file_stamp = None
+    assert view.update() == [(3, 4, 3, 3)]
+    assert len(view.hasher) == 4
+
+
+def test_shuffled_lines_stay_within_the_budget():
+    random.seed(3)
+    a = list(range(20000))
+    b = list(a)
+    random.shuffle(b)
+    hunks = diff(a, b, max_cost=200)
+    assert patch(a, b, hunks) == b
+    assert len(hunks) < 50
+
+
+def test_next_hunk_jumps_within_the_screen(interface, tmpdir):
+    path = tmpdir.join('file.txt')
+    path.write('\n'.join('line {}'.format(i) for i in range(100)))
+    interface.open(str(path))
+    for y in (5, 10, 50, 80):
+        interface.lines[y] = 'changed'
+    view = DiffView(interface, str(path))
+
+    view.next_hunk()
+    assert interface.line_no == 5
+    view.next_hunk()
+    assert interface.line_no == 10
+
+    view.next_hunk()
+    assert interface.line_no == 5
+    message = interface.stdscr.ops[-2][2]
+    assert message == (23, 0, '2 more changes below the screen, the next at line 51')
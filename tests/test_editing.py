@@ -0,0 +1,36 @@
+def test_insert_text_normalizes_line_endings(interface):
+    interface.load_text('ab')
+    interface.insert_text('1\r\n2\r3', at=(1, 0))
+    assert list(interface.lines) == ['a1', '2', '3b']
+    assert (interface.cursor.x, interface.line_no) == (1, 2)
+
+
+def test_insert_lines_in_the_middle_of_a_line(interface):
+    interface.load_text('first\nhead-tail\nlast')
+    interface.insert_text('one\ntwo\nthree', at=(5, 1))
+    assert list(interface.lines) == ['first', 'head-one', 'two', 'threetail', 'last']
+    assert (interface.cursor.x, interface.line_no) == (5, 3)
+    assert interface.current_line == 'threetail'
+
+
+def test_insert_text_on_one_line(interface):
+    interface.load_text('abc')
+    interface._set_position(1, 0)
+    interface.insert_text('XY')
+    assert list(interface.lines) == ['aXYbc']
+    assert interface.cursor.x == 3
+
+
+def test_delete_range_in_either_order(interface):
+    interface.load_text('abcdef')
+    interface.delete_range((4, 0), (1, 0))
+    assert list(interface.lines) == ['aef']
+    assert (interface.cursor.x, interface.line_no) == (1, 0)
+
+
+def test_delete_range_across_lines(interface):
+    interface.load_text('one\ntwo\nthree\nfour')
+    interface.delete_range((1, 0), (2, 2))
+    assert list(interface.lines) == ['oree', 'four']
+    assert (interface.cursor.x, interface.line_no) == (1, 0)
+    assert interface.current_line == 'oree'
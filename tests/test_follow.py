@@ -0,0 +1,43 @@
+def rows(session, count):
+    session.interface.stdscr.flush(force=True)
+    return [''.join(row).rstrip() for row in session.terminal.chars[:count]]
+
+
+def follow(session, tmpdir, cap, text=''):
+    path = tmpdir.join('log')
+    path.write(text)
+    session.interface.follow(str(path), cap=cap, interval=0)
+    return path
+
+
+def test_evicted_lines_scroll_off_the_screen(session, tmpdir):
+    path = follow(session, tmpdir, 4)
+    follower = session.interface.follower
+    for i in range(6):
+        path.write('line{}\n'.format(i), mode='a')
+        follower.poll()
+        assert rows(session, 5) == list(follower.lines) + [''] * (5 - len(follower.lines))
+    assert list(follower.lines) == ['line2', 'line3', 'line4', 'line5']
+
+
+def test_new_lines_scroll_a_full_screen(session, tmpdir):
+    path = follow(session, tmpdir, 1000, ''.join('old{}\n'.format(i) for i in range(30)))
+    follower = session.interface.follower
+    path.write('new0\nnew1\n', mode='a')
+    follower.poll()
+    assert rows(session, 24) == list(follower.lines)[-24:]
+
+
+def test_unfollow_with_more_lines_than_rows(session, tmpdir):
+    path = follow(session, tmpdir, 1000, ''.join('line{}\n'.format(i) for i in range(100)))
+    session.interface.unfollow()
+    session.interface.stdscr.apply()
+    assert session.interface.line_no == 23
+
+
+def test_no_edits_while_following(session, tmpdir):
+    follow(session, tmpdir, 4, 'one\ntwo\n')
+    interface = session.interface
+    interface.insert_text('x\ny', at=(0, 0))
+    interface.delete_range((0, 0), (1, 1))
+    assert list(interface.follower.lines) == ['one', 'two']
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+import common
+from common import CompactLines, Lines
+
+
+def offsets(lines):
+    result, total = [], 0
+    for line in lines:
+        result.append(total)
+        total += len(line) + 1
+    return result
+
+
+def check(lines):
+    index = lines.line_index
+    expected = offsets(lines)
+    for i, offset in enumerate(expected):
+        assert index.prefix(i) == offset
+        assert index.find(offset) == i
+        assert index.find(offset + len(lines[i])) == i
+    assert index.total() == max(sum(len(line) + 1 for line in lines) - 1, 0)
+
+
+def test_empty_and_single_line():
+    check(Lines(['']))
+    check(Lines(['hello']))
+
+
+def test_single_line_edits_and_appends():
+    lines = Lines(['a', 'bb', 'ccc'])
+    check(lines)
+    lines[1] = 'bbbbbb'
+    lines.append('dd')
+    lines.extend(['e', 'ffff'])
+    assert not lines.line_index.dirty
+    check(lines)
+
+
+def test_structural_edits():
+    lines = Lines(['a', 'bb', 'ccc', 'dddd'])
+    check(lines)
+    lines.insert(1, 'xyz')
+    del lines[0]
+    lines[1:3] = ['1', '22', '333']
+    check(lines)
+
+
+def test_inserts_and_deletes_keep_the_index(monkeypatch):
+    # Small blocks so that blocks are split and emptied.
+    monkeypatch.setattr(common, 'LINE_BLOCK', 4)
+    random.seed(127)
+    lines = Lines(['x' * random.randrange(5) for _ in range(40)])
+    model = list(lines)
+    check(lines)
+    for _ in range(300):
+        i = random.randrange(len(model) + 1)
+        j = min(len(model), i + random.randrange(10))
+        new = ['y' * random.randrange(6) for _ in range(random.randrange(12))]
+        if len(model) - (j - i) + len(new) == 0:
+            new = ['']
+        lines[i:j] = new
+        model[i:j] = new
+        assert not lines.line_index.dirty
+        check(lines)
+    assert list(lines) == model
+
+
+def test_random_edits_match_rebuild():
+    random.seed(27)
+    for lines in (Lines(['']), CompactLines('')):
+        model = ['']
+        for _ in range(500):
+            op = random.randrange(4)
+            i = random.randrange(len(model))
+            text = 'x' * random.randrange(6)
+            if op == 0:
+                lines[i] = model[i] = text
+            elif op == 1:
+                lines.insert(i, text)
+                model.insert(i, text)
+            elif op == 2 and len(model) > 1:
+                del lines[i]
+                del model[i]
+            else:
+                lines.append(text)
+                model.append(text)
+            if random.random() < 0.1:
+                check(lines)
+        assert list(lines) == model
+        check(lines)
+
+
+def test_goto_line_below_the_screen_is_refused(interface):
+    interface.load_text('\n'.join('line {}'.format(i) for i in range(100)))
+    interface.goto_line(5)
+    assert (interface.cursor.x, interface.line_no) == (0, 5)
+    with pytest.raises(ValueError):
+        interface.goto_line(50)
+    assert interface.line_no == 5
+
+
+def test_goto_callback_reports_lines_below_the_screen(interface):
+    interface.load_text('\n'.join('line {}'.format(i) for i in range(100)))
+    interface.prompt = lambda message: '51'
+    interface.feed(7)
+    assert interface.line_no == 0
+    assert interface.stdscr.ops[-2][1:] == ('addstr', (23, 0, 'Line 51 is below the screen'))
+    interface.prompt = lambda message: '8'
+    interface.feed(7)
+    assert interface.line_no == 7
+
+
+def test_prompt_waits_for_input(interface):
+    interface.stdscr.nodelay(1)
+    assert interface.prompt('Go to line: ') == '12'
+    assert interface.stdscr.delay == 0
@@ -0,0 +1,17 @@
+from common import CompactLines, Lines, line_memory
+
+
+def test_memory_counts_the_offset_index():
+    text = '\n'.join('line {}'.format(i) for i in range(10000))
+    for lines in (CompactLines(text), Lines(text.split('\n'))):
+        before = line_memory(lines)['bytes'] - lines.line_index.memory()
+        lines.line_index.find(5000)
+        assert line_memory(lines)['bytes'] - before == lines.line_index.memory()
+        assert lines.line_index.memory() < 10 * len(lines)
+
+
+def test_compact_lines_stay_smaller_with_the_index():
+    lines = CompactLines('\n'.join('line {}'.format(i) for i in range(10000)))
+    lines.line_index.total()
+    report = line_memory(lines)
+    assert report['bytes'] < report['list_bytes'] / 2
@@ -0,0 +1,21 @@
+from profiler import Profiler, process_profiler
+
+
+def test_one_profiler_per_process(interface):
+    assert interface.profiler is process_profiler()
+    assert process_profiler() is process_profiler()
+
+
+def test_quick_runs_write_separate_files(tmpdir):
+    profiler = Profiler('cprofile', str(tmpdir))
+    first = profiler.start().stop()
+    second = profiler.start().stop()
+    assert first != second
+    assert len(tmpdir.listdir()) == 2
+
+
+def test_sessions_cannot_profile(session):
+    session.handle(b'\x10')
+    assert session.interface.profiler is None
+    assert not process_profiler().running
+    assert ''.join(session.terminal.chars[23]).startswith('Profiling is not available')
@@ -0,0 +1,96 @@
+from common import Screen
+from conftest import FakeWindow
+
+
+def test_refresh_erases_instead_of_clearing(interface):
+    interface.load_text('one\ntwo')
+    names = [op[1] for op in interface.stdscr.ops]
+    assert 'clear' not in names
+    assert names[0] == 'erase'
+
+
+def test_erase_drops_earlier_writes():
+    screen = Screen(FakeWindow())
+    screen.addstr(0, 0, 'old')
+    screen.erase()
+    screen.addstr(0, 0, 'new')
+    assert [op[1:] for op in screen.ops] == [('erase', ()), ('addstr', (0, 0, 'new'))]
+
+
+class Updates(object):
+    """
+    Stand-in for the curses module that counts doupdate calls.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def doupdate(self):
+        self.count += 1
+
+
+def ops(screen):
+    return [op[1:] for op in screen.ops]
+
+
+def test_covered_writes_are_dropped():
+    screen = Screen(FakeWindow())
+    screen.addstr(0, 2, 'ab')
+    screen.addstr(1, 0, 'other row')
+    screen.addstr(0, 0, 'abcdef')
+    assert ops(screen) == [('addstr', (1, 0, 'other row')), ('addstr', (0, 0, 'abcdef'))]
+
+
+def test_partly_covered_writes_are_kept():
+    screen = Screen(FakeWindow())
+    screen.addstr(0, 2, 'abcd')
+    screen.addstr(0, 0, 'xyz')
+    assert ops(screen) == [('addstr', (0, 2, 'abcd')), ('addstr', (0, 0, 'xyz'))]
+
+
+def test_writes_before_a_cursor_relative_write_are_kept():
+    screen = Screen(FakeWindow())
+    screen.addstr(0, 0, 'ab')
+    screen.addstr('relative')
+    screen.addstr(0, 0, 'cd')
+    assert len(screen.ops) == 3
+
+
+def test_consecutive_moves_are_merged():
+    screen = Screen(FakeWindow())
+    screen.move(1, 1)
+    screen.move(2, 2)
+    screen.move_cursor(3, 4)
+    assert ops(screen) == [('move', (4, 3))]
+    screen.addstr(0, 0, 'x')
+    screen.move(5, 5)
+    assert ops(screen) == [('move', (4, 3)), ('addstr', (0, 0, 'x')), ('move', (5, 5))]
+
+
+def test_bursts_of_flushes_update_once_per_frame():
+    screen = Screen(FakeWindow())
+    screen.curses = Updates()
+    for i in range(50):
+        screen.addstr(0, 0, str(i))
+        screen.flush()
+    assert screen.curses.count == 1
+    assert screen.pending
+
+    screen.flush(force=True)
+    assert screen.curses.count == 2
+    assert not screen.pending
+
+
+def test_getch_writes_the_pending_frame_when_no_key_comes():
+    screen = Screen(FakeWindow())
+    screen.curses = Updates()
+    screen.addstr(0, 0, 'first')
+    screen.flush()
+    screen.addstr(0, 0, 'second')
+    screen.flush()
+    assert screen.pending and screen.curses.count == 1
+
+    screen.timeout(100)
+    assert screen.getch() == -1
+    assert not screen.pending
+    assert screen.curses.count == 2
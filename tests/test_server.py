@@ -0,0 +1,73 @@
+import pytest
+
+from server import KeyDecoder
+
+
+@pytest.mark.parametrize('session', [80, 200], indirect=True)
+def test_mid_line_edits_at_any_width(session):
+    session.handle(b'abc\x1b[D\x1b[DXY')
+    assert list(session.interface.lines) == ['aXYbc']
+    assert session.errors == 0
+
+
+@pytest.mark.parametrize('session, drawn', [(80, False), (200, True)], indirect=['session'])
+def test_debug_pad_only_on_wide_terminals(session, drawn):
+    assert (session.interface.debug_pad is not None) == drawn
+
+
+def test_failed_writes_are_skipped_and_the_rest_drawn(session):
+    screen = session.interface.stdscr
+    screen.addstr(100, 0, 'off screen')
+    screen.addstr(1, 0, 'drawn')
+    errors = []
+    screen.apply(errors)
+    assert [name for name, args, error in errors] == ['addstr']
+    assert session.terminal.chars[1][:5] == list('drawn')
+
+
+def test_trailing_escape_waits_for_the_next_read():
+    decoder = KeyDecoder()
+    assert decoder.feed(b'a\x1b') == [97]
+    assert decoder.feed(b'[A') == [259]
+    assert decoder.feed(b'\x1b') == []
+    assert decoder.feed(b'x') == [27, 120]
+    assert decoder.feed(b'\x1b[') == []
+    assert decoder.flush() == [27, 91]
+    assert decoder.flush() == []
+
+
+class Loop(object):
+    """
+    Loop that only records the calls scheduled on it.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def call_later(self, delay, callback, *args):
+        call = (callback, args)
+        self.calls.append(call)
+        return Handle(self.calls, call)
+
+
+class Handle(object):
+
+    def __init__(self, calls, call):
+        self.calls, self.call = calls, call
+
+    def cancel(self):
+        self.calls.remove(self.call)
+
+
+def test_lone_escape_is_pressed_after_a_delay(session):
+    loop = Loop()
+    session.handle(b'ab\x1b', loop)
+    assert session.keys == 2
+    args, = [args for callback, args in loop.calls if callback == session._flush_keys]
+    session._flush_keys(*args)
+    assert session.keys == 3 and session.interface.ch == 27
+    del loop.calls[:]
+    session.handle(b'\x1b', loop)
+    session.handle(b'[D', loop)
+    assert session._flush_keys not in [callback for callback, args in loop.calls]
+    assert session.interface.ch == 260
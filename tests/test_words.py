@@ -0,0 +1,53 @@
+from common import Lines, next_word_end, previous_word_start
+
+
+def test_word_motion():
+    lines = Lines(['foo bar  baz'])
+    assert next_word_end(lines, 0, 0) == 3
+    assert next_word_end(lines, 0, 3) == 7
+    assert next_word_end(lines, 0, 12) == 12
+    assert previous_word_start(lines, 0, 12) == 9
+    assert previous_word_start(lines, 0, 4) == 0
+    assert previous_word_start(lines, 0, 0) == 0
+
+
+def test_boundaries_are_dropped_on_edits():
+    lines = Lines(['one two', 'three', 'four'])
+    for y in range(3):
+        lines.word_index.boundaries(y)
+    lines[0] = 'one'
+    assert 0 not in lines.word_index.cache
+    assert next_word_end(lines, 0, 0) == 3
+
+    lines.insert(0, 'zero')
+    assert set(lines.word_index.cache) == set()
+    assert next_word_end(lines, 2, 0) == 5
+    del lines[0]
+    assert next_word_end(lines, 1, 0) == 5
+
+
+def test_delete_word_backward_moves_extra_cursors(interface):
+    interface.load_text('ab\ncd\nef')
+    interface._set_position(0, 1)
+    interface.feed(14)
+    assert interface.cursors.positions == [(2, 0)]
+    interface.feed(23)
+    assert list(interface.lines) == ['abcd', 'ef']
+    assert interface.cursors.positions == [(1, 0)]
+    interface.feed(ord('Z'))
+    assert list(interface.lines) == ['abZcd', 'Zef']
+
+
+def test_delete_word_forward(interface):
+    interface.load_text('foo bar  baz\nqux')
+    interface._set_position(3, 0)
+    interface.feed(11)
+    assert list(interface.lines) == ['foo  baz', 'qux']
+    interface.feed(11)
+    assert list(interface.lines) == ['foo', 'qux']
+    interface.feed(11)
+    assert list(interface.lines) == ['fooqux']
+    assert (interface.line_no, interface.cursor.x) == (0, 3)
+    interface.feed(11)
+    interface.feed(11)
+    assert list(interface.lines) == ['foo']
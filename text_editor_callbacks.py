@@ -7,6 +7,7 @@ class Unregistered(Callback):
     """
 
     debug = True
+    edits = True
     ch = -1
 
     def __init__(self):
@@ -28,6 +29,11 @@ class Unregistered(Callback):
         except ValueError:
             return True
 
+        # Apply the key at every cursor in a single pass.
+        if interface.cursors:
+            interface.insert_at_cursors(chr_ch)
+            return True
+
         interface.current_line = string_insert(interface.current_line, cursor_x, chr_ch)
         interface.lines[interface.line_no] = interface.current_line
         interface.stdscr.addstr(interface.cursor.y, interface.cursor.x, chr_ch)
@@ -44,6 +50,9 @@ class Unregistered(Callback):
 
 
 class CntrlRightArrow(Callback):
+    """
+    Move the cursor to the end of the next word.
+    """
 
     debug = True
     ch = 27
@@ -53,7 +62,8 @@ class CntrlRightArrow(Callback):
         self.ch = CntrlRightArrow.ch
 
     def callback(self, interface):
-        cursor_x, cursor_y = len(interface.current_line), interface.cursor.y
+        cursor_y = interface.cursor.y
+        cursor_x = next_word_end(interface.lines, interface.line_no, interface.cursor.x)
         interface.stdscr.move(cursor_y, cursor_x)
         # interface.stdscr.move_cursor(cursor_x, cursor_y)
 
@@ -64,6 +74,9 @@ class CntrlRightArrow(Callback):
 
 
 class CntrlLeftArrow(Callback):
+    """
+    Move the cursor to the start of the previous word.
+    """
 
     debug = True
     ch = 26
@@ -73,7 +86,8 @@ class CntrlLeftArrow(Callback):
         self.ch = CntrlLeftArrow.ch
 
     def callback(self, interface):
-        cursor_x, cursor_y = 0, interface.cursor.y
+        cursor_y = interface.cursor.y
+        cursor_x = previous_word_start(interface.lines, interface.line_no, interface.cursor.x)
         interface.stdscr.move(cursor_y, cursor_x)
         # interface.stdscr.move_cursor(cursor_x, cursor_y)
 
@@ -124,6 +138,7 @@ class Backspace(Callback):
     """
 
     debug = True
+    edits = True
     ch = 127
 
     def __init__(self):
@@ -140,6 +155,10 @@ class Backspace(Callback):
 
         cursor_y, cursor_x = interface.cursor.y, interface.cursor.x
 
+        if interface.cursors:
+            interface.backspace_at_cursors()
+            return True
+
         # Cannot go any further back.
         if cursor_x == 0 and cursor_y == 0:
             return True
@@ -190,6 +209,7 @@ class Space(Callback):
     """
 
     debug = True
+    edits = True
     ch = 32
 
     def __init__(self):
@@ -205,6 +225,10 @@ class Space(Callback):
         """
         cursor_y, cursor_x = interface.cursor.y, interface.cursor.x
 
+        if interface.cursors:
+            interface.insert_at_cursors(' ')
+            return True
+
         if cursor_x < len(interface.current_line):
             update_line(string_insert(interface.current_line, cursor_x, ' '), interface)
             interface.stdscr.addstr(cursor_y, cursor_x - 1, '{}'.format(interface.current_line[cursor_x - 1:]))
@@ -231,6 +255,7 @@ class Enter(Callback):
     """
 
     debug = True
+    edits = True
     ch = 10
 
     def __init__(self):
@@ -247,6 +272,10 @@ class Enter(Callback):
 
         cursor_y, cursor_x = interface.cursor.y, interface.cursor.x
 
+        if interface.cursors:
+            interface.newline_at_cursors()
+            return True
+
         # Handle wrapped text.
         if cursor_x < len(interface.current_line):
             # Get the remainder of the line.
@@ -287,7 +316,6 @@ class Enter(Callback):
             interface_info_refresh(interface, 0, cursor_y + 1)
 
         interface.pad_pos += 1
-        interface.pad.refresh(interface.pad_pos, 0, 5, 5, 10, 60)
 
         interface.stdscr.move_cursor(0, cursor_y + 1)
         return True
@@ -461,3 +489,331 @@ class ArrowRight(Callback):
             interface_info_refresh(interface, cursor_x + 1, cursor_y)
 
         return True
+
+
+class DeleteWordBackward(Callback):
+    """
+    Handle tapping Ctrl-W to delete back to the start of the previous word.
+    """
+
+    debug = True
+    edits = True
+    ch = 23
+
+    def __init__(self):
+        self.debug = DeleteWordBackward.debug
+        self.ch = DeleteWordBackward.ch
+
+    def callback(self, interface):
+        """
+        Handle tapping Ctrl-W.
+
+        :param interface:
+        :return:
+        """
+
+        cursor_y, cursor_x = interface.line_no, interface.cursor.x
+
+        # Cannot go any further back.
+        if cursor_x == 0 and cursor_y == 0:
+            return True
+
+        # Beginning of current line joins it onto the last line.
+        if cursor_x == 0:
+            start = (len(interface.lines[cursor_y - 1]), cursor_y - 1)
+        else:
+            start = (previous_word_start(interface.lines, cursor_y, cursor_x), cursor_y)
+        interface.delete_range(start, (cursor_x, cursor_y))
+
+        if DeleteWordBackward.debug:
+            interface_info_refresh(interface, interface.cursor.x, interface.line_no)
+
+        return True
+
+
+class DeleteWordForward(Callback):
+    """
+    Handle tapping Ctrl-K to delete up to the end of the next word. Alt-D
+    arrives as Escape and then d, and Escape already moves a word right.
+    """
+
+    debug = True
+    edits = True
+    ch = 11
+
+    def __init__(self):
+        self.debug = DeleteWordForward.debug
+        self.ch = DeleteWordForward.ch
+
+    def callback(self, interface):
+        """
+        Handle tapping Ctrl-K.
+
+        :param interface:
+        :return:
+        """
+
+        cursor_y, cursor_x = interface.line_no, interface.cursor.x
+
+        # End of the current line joins the next line onto it.
+        if cursor_x >= len(interface.lines[cursor_y]):
+            if cursor_y + 1 >= len(interface.lines):
+                return True
+            end = (0, cursor_y + 1)
+        else:
+            end = (next_word_end(interface.lines, cursor_y, cursor_x), cursor_y)
+        interface.delete_range((cursor_x, cursor_y), end)
+
+        if DeleteWordForward.debug:
+            interface_info_refresh(interface, interface.cursor.x, interface.line_no)
+
+        return True
+
+
+class AddCursorBelow(Callback):
+    """
+    Handle tapping Ctrl-N to add a cursor on the line below the lowest cursor.
+    """
+
+    debug = True
+    ch = 14
+
+    def __init__(self):
+        self.debug = AddCursorBelow.debug
+        self.ch = AddCursorBelow.ch
+
+    def callback(self, interface):
+        """
+        Handle tapping Ctrl-N.
+
+        :param interface:
+        :return:
+        """
+
+        cursor_y, cursor_x = interface.line_no, interface.cursor.x
+        lowest = max([cursor_y] + [y for y, x in interface.cursors])
+
+        if lowest + 1 < len(interface.lines):
+            next_line_len = len(interface.lines[lowest + 1])
+            move_x = next_line_len if cursor_x > next_line_len else cursor_x
+            interface.add_cursor(move_x, lowest + 1)
+
+        if AddCursorBelow.debug:
+            interface_info_refresh(interface, cursor_x, cursor_y)
+
+        return True
+
+
+class ClearCursors(Callback):
+    """
+    Handle tapping Ctrl-U to remove the extra cursors.
+    """
+
+    debug = True
+    ch = 21
+
+    def __init__(self):
+        self.debug = ClearCursors.debug
+        self.ch = ClearCursors.ch
+
+    def callback(self, interface):
+        """
+        Handle tapping Ctrl-U.
+
+        :param interface:
+        :return:
+        """
+
+        interface.clear_cursors()
+
+        if ClearCursors.debug:
+            interface_info_refresh(interface, interface.cursor.x, interface.line_no)
+
+        return True
+
+
+class ToggleProfiler(Callback):
+    """
+    Handle tapping Ctrl-P to start or stop profiling. Stopping writes the
+    results and shows where they were written on the bottom row. Does
+    nothing when the interface has no profiler.
+    """
+
+    debug = True
+    ch = 16
+
+    def __init__(self):
+        self.debug = ToggleProfiler.debug
+        self.ch = ToggleProfiler.ch
+
+    def callback(self, interface):
+        """
+        Handle tapping Ctrl-P.
+
+        :param interface:
+        :return:
+        """
+
+        cursor_y, cursor_x = interface.cursor.y, interface.cursor.x
+
+        if interface.profiler is None:
+            message = 'Profiling is not available'
+        else:
+            paths = interface.profiler.toggle()
+            if interface.profiler.running:
+                message = 'Profiling ({})'.format(interface.profiler.mode)
+            else:
+                message = 'Profile written to {}'.format(', '.join(paths))
+
+        max_y, max_x = interface.stdscr.getmaxyx()
+        interface.stdscr.addstr(max_y - 1, 0, message[:max_x - 1])
+
+        if ToggleProfiler.debug:
+            interface_info_refresh(interface, cursor_x, cursor_y)
+
+        interface.stdscr.move_cursor(cursor_x, cursor_y)
+        return True
+
+
+class GoTo(Callback):
+    """
+    Handle tapping Ctrl-G to go to a line number, or to an absolute
+    character offset when the answer starts with `#`.
+    """
+
+    debug = True
+    ch = 7
+
+    def __init__(self):
+        self.debug = GoTo.debug
+        self.ch = GoTo.ch
+
+    def callback(self, interface):
+        """
+        Handle tapping Ctrl-G.
+
+        :param interface:
+        :return:
+        """
+
+        cursor_y, cursor_x = interface.cursor.y, interface.cursor.x
+        answer = interface.prompt('Go to line (#offset): ').strip()
+
+        try:
+            number = int(answer[1:] if answer.startswith('#') else answer)
+        except ValueError:
+            interface.stdscr.move_cursor(cursor_x, cursor_y)
+            return True
+
+        try:
+            if answer.startswith('#'):
+                interface.goto_offset(number)
+            else:
+                interface.goto_line(number - 1)
+        except ValueError as e:
+            interface.show_message(str(e))
+            return True
+
+        if GoTo.debug:
+            interface_info_refresh(interface, interface.cursor.x, interface.cursor.y)
+
+        return True
+
+
+class ToggleDiff(Callback):
+    """
+    Handle tapping Ctrl-D to mark the lines that differ from the file on
+    disk, or to stop marking them.
+    """
+
+    debug = True
+    ch = 4
+
+    def __init__(self):
+        self.debug = ToggleDiff.debug
+        self.ch = ToggleDiff.ch
+
+    def callback(self, interface):
+        """
+        Handle tapping Ctrl-D.
+
+        :param interface:
+        :return:
+        """
+
+        cursor_y, cursor_x = interface.cursor.y, interface.cursor.x
+
+        try:
+            interface.toggle_diff()
+        except (ValueError, OSError):
+            max_y, max_x = interface.stdscr.getmaxyx()
+            interface.stdscr.addstr(max_y - 1, 0, 'No file to diff against'[:max_x - 1])
+
+        if ToggleDiff.debug:
+            interface_info_refresh(interface, cursor_x, cursor_y)
+
+        interface.stdscr.move_cursor(cursor_x, cursor_y)
+        return True
+
+
+class NextHunk(Callback):
+    """
+    Handle tapping Ctrl-] to go to the next changed lines while the diff is
+    shown.
+    """
+
+    debug = True
+    ch = 29
+
+    def __init__(self):
+        self.debug = NextHunk.debug
+        self.ch = NextHunk.ch
+
+    def callback(self, interface):
+        """
+        Handle tapping Ctrl-].
+
+        :param interface:
+        :return:
+        """
+
+        if interface.diff_view is None:
+            return True
+
+        interface.diff_view.next_hunk()
+
+        if NextHunk.debug:
+            interface_info_refresh(interface, interface.cursor.x, interface.cursor.y)
+
+        return True
+
+
+class Complete(Callback):
+    """
+    Handle tapping Ctrl-Space to show completions for the word before the
+    cursor, taken from the words in the lines.
+    """
+
+    debug = True
+    edits = True
+    ch = 0
+
+    def __init__(self):
+        self.debug = Complete.debug
+        self.ch = Complete.ch
+
+    def callback(self, interface):
+        """
+        Handle tapping Ctrl-Space.
+
+        :param interface:
+        :return:
+        """
+
+        interface.show_completions()
+
+        if Complete.debug:
+            interface_info_refresh(interface, interface.cursor.x, interface.cursor.y)
+
+        interface.stdscr.move_cursor(interface.cursor.x, interface.line_no)
+        return True